@@ -0,0 +1,296 @@
+# backend/availability.py
+import json
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+
+
+def to_minutes(value) -> int:
+    """
+    Converts a time-of-day into minutes since midnight.
+    Accepts "HH:MM[:SS]" strings, datetime.time, the timedelta that
+    mysql.connector returns for TIME columns, and plain minute counts.
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    parts = str(value).strip().split(":")
+    return int(parts[0]) * 60 + int(parts[1])
+
+
+def format_minutes(minutes: int) -> str:
+    """Formats minutes since midnight as "HH:MM:SS"."""
+    return f"{minutes // 60:02}:{minutes % 60:02}:00"
+
+
+TIME_OF_DAY_RANGES = {
+    "morning": (0, 12 * 60),
+    "afternoon": (12 * 60, 17 * 60),
+    "evening": (17 * 60, 24 * 60),
+}
+
+_CLOCK_TIME = re.compile(r"^(\d{1,2}):(\d{2})(?::\d{2})?$")
+
+
+def parse_preference(preference: str = None):
+    """
+    Normalizes a caller's time preference: None when there is none, a (lo, hi)
+    minute range for "morning"/"afternoon"/"evening", or the minute of a clock
+    time ("15:00"). Raises ValueError listing the accepted values otherwise.
+    """
+    if not preference or not str(preference).strip():
+        return None
+    key = str(preference).strip().lower()
+    if key in TIME_OF_DAY_RANGES:
+        return TIME_OF_DAY_RANGES[key]
+    clock = _CLOCK_TIME.match(key)
+    if not clock or int(clock.group(1)) > 23 or int(clock.group(2)) > 59:
+        raise ValueError(f"Unknown time preference '{preference}' "
+                         f"(use {', '.join(TIME_OF_DAY_RANGES)} or a time such as 15:00).")
+    return int(clock.group(1)) * 60 + int(clock.group(2))
+
+
+def preference_penalty(preference: str = None):
+    """
+    Builds a scoring function for a caller's time-of-day preference.
+    "morning"/"afternoon"/"evening" score 0 inside the range and 1 outside;
+    a clock time ("15:00") scores by distance in minutes. Lower is better.
+    """
+    parsed = parse_preference(preference)
+    if parsed is None:
+        return lambda minutes: 0
+    if isinstance(parsed, tuple):
+        lo, hi = parsed
+        return lambda minutes: 0 if lo <= minutes < hi else 1
+    return lambda minutes: abs(minutes - parsed)
+
+
+class SlotGrid:
+    """
+    The clinic's bookable start times for one day, as a bit layout.
+    Bit i of a mask stands for the i-th slot (in time order), which covers
+    `slot_minutes` minutes from its start time.
+    """
+
+    def __init__(self, slot_times, slot_minutes: int = 30):
+        self.slot_minutes = slot_minutes
+        self.minutes = tuple(sorted({to_minutes(t) for t in slot_times}))
+        self.index = {m: i for i, m in enumerate(self.minutes)}
+        self.full_mask = (1 << len(self.minutes)) - 1
+
+    def bit(self, value):
+        """Returns the single-bit mask for a slot, or None if it is not on the grid."""
+        i = self.index.get(to_minutes(value))
+        return None if i is None else 1 << i
+
+    def span_mask(self, start: int, end: int) -> int:
+        """Mask of every slot that overlaps the minutes [start, end)."""
+        lo = bisect_right(self.minutes, start - self.slot_minutes)
+        hi = bisect_left(self.minutes, end)
+        return ((1 << hi) - 1) & ~((1 << lo) - 1) if hi > lo else 0
+
+    def mask_after(self, minutes: int) -> int:
+        """Mask of slots that start strictly after the given minute of the day."""
+        mask = 0
+        for i, m in enumerate(self.minutes):
+            if m > minutes:
+                mask |= 1 << i
+        return mask
+
+    def time_at(self, mask: int) -> str:
+        """Returns the slot time of the lowest set bit in `mask`."""
+        return format_minutes(self.minutes[(mask & -mask).bit_length() - 1])
+
+
+def build_booked_masks(grid: SlotGrid, bookings) -> dict:
+    """
+    Folds appointment rows into {(day, dentist_id): occupied_mask}.
+    Every slot an appointment overlaps (start to appointment_end_time) is marked.
+    """
+    booked = {}
+    for row in bookings:
+        start = to_minutes(row['appointment_start_time'])
+        end_time = row.get('appointment_end_time')
+        end = to_minutes(end_time) if end_time is not None else start + 1
+        mask = grid.span_mask(start, max(end, start + 1))
+        if not mask:
+            continue
+        key = (row['appointment_date'], row['dentist_id'])
+        booked[key] = booked.get(key, 0) | mask
+    return booked
+
+
+class AvailabilityWindow:
+    """
+    Booked-slot bitmaps for every (day, dentist) in a date window, searched
+    against the calendar's working-time templates for appointments of
+    `duration` minutes (the calendar default when None).
+    `booked` maps (day, dentist_id) to a mask; missing keys mean nothing is booked.
+    """
+
+    def __init__(self, calendar, start: date, end: date, booked: dict = None, duration: int = None):
+        self.calendar = calendar
+        self.grid = calendar.grid
+        self.start = start
+        self.end = end
+        self.booked = booked or {}
+        self.cells = calendar.cells_for(duration)
+
+    def days(self):
+        """Yields the days in the window on which the clinic is open."""
+        return self.calendar.open_days(self.start, self.end)
+
+    def block(self, day: date, dentist_id: int, spans):
+        """Marks extra (start, end) minute spans (e.g. slots held for another caller) as occupied."""
+        mask = 0
+        for start, end in spans:
+            mask |= self.grid.span_mask(start, end)
+        if mask:
+            self.booked[(day, dentist_id)] = self.booked.get((day, dentist_id), 0) | mask
+
+    def free_mask(self, day: date, dentist_id: int, now: datetime = None) -> int:
+        """Mask of slots where an appointment of the window's length can start."""
+        booked = self.booked.get((day, dentist_id), 0)
+        blocked = booked
+        # A start is blocked if any slot it would cover is booked
+        for shift in range(1, self.cells):
+            blocked |= booked >> shift
+        mask = self.calendar.start_mask(day, dentist_id, self.cells) & ~blocked
+        if now is not None and day == now.date():
+            mask &= self.grid.mask_after(now.hour * 60 + now.minute)
+        return mask
+
+    def free_minutes(self, day: date, dentist_id: int, now: datetime = None):
+        """Yields the start minute of every free slot for one dentist on one day."""
+        mask = self.free_mask(day, dentist_id, now)
+        while mask:
+            lowest = mask & -mask
+            yield self.grid.minutes[lowest.bit_length() - 1]
+            mask ^= lowest
+
+    def is_free(self, day: date, dentist_id: int, slot_time, now: datetime = None) -> bool:
+        bit = self.grid.bit(slot_time)
+        return bit is not None and bool(self.free_mask(day, dentist_id, now) & bit)
+
+    def earliest(self, dentist_order, now: datetime = None):
+        """
+        Finds the earliest free slot in the window.
+        Ties on the same slot go to the dentist listed first in `dentist_order`.
+        Returns (day, "HH:MM:SS", dentist_id) or None.
+        """
+        for day in self.days():
+            free = {d_id: self.free_mask(day, d_id, now) for d_id in dentist_order}
+            any_free = 0
+            for mask in free.values():
+                any_free |= mask
+            if not any_free:
+                continue
+            lowest = any_free & -any_free
+            for d_id in dentist_order:
+                if free[d_id] & lowest:
+                    return day, self.grid.time_at(lowest), d_id
+        return None
+
+    def earliest_at(self, slot_time, dentist_order, now: datetime = None):
+        """
+        Finds the first day on which `slot_time` is free with any dentist.
+        Returns (day, "HH:MM:SS", dentist_id) or None.
+        """
+        bit = self.grid.bit(slot_time)
+        if bit is None:
+            return None
+        for day in self.days():
+            for d_id in dentist_order:
+                if self.free_mask(day, d_id, now) & bit:
+                    return day, format_minutes(to_minutes(slot_time)), d_id
+        return None
+
+    def ranked(self, dentist_order, count: int, preferred_id: int = None,
+               preference: str = None, now: datetime = None):
+        """
+        Returns up to `count` free slots as (day, "HH:MM:SS", dentist_id),
+        ranked by date, then the preferred dentist, then the time-of-day
+        preference, then time. Stops after the first day that fills `count`.
+        """
+        penalty = preference_penalty(preference)
+        rank = {d_id: i for i, d_id in enumerate(dentist_order)}
+        results = []
+        for day in self.days():
+            candidates = [
+                (d_id != preferred_id, penalty(minutes), minutes, rank[d_id], d_id)
+                for d_id in dentist_order
+                for minutes in self.free_minutes(day, d_id, now)
+            ]
+            candidates.sort()
+            results.extend((day, format_minutes(c[2]), c[4]) for c in candidates[:count - len(results)])
+            if len(results) >= count:
+                break
+        return results
+
+
+# Cell codes in an OccupancyMatrix row
+CLOSED, FREE, BOOKED = 0, 1, 2
+_CELL_CHARS = bytes.maketrans(bytes([CLOSED, FREE, BOOKED]), b"-.#")
+
+
+class OccupancyMatrix:
+    """
+    Dense dentist x day x slot occupancy for a date range.
+    Each dentist gets one bytearray of len(days) * len(grid) cell codes,
+    filled from the calendar templates and booked bitmaps.
+    """
+
+    def __init__(self, calendar, start: date, end: date, dentists: dict, booked: dict):
+        self.grid = calendar.grid
+        self.start = start
+        self.end = end
+        self.dentists = dentists
+        self.days = []
+        current = start
+        while current <= end:
+            self.days.append(current)
+            current += timedelta(days=1)
+        width = len(self.grid.minutes)
+        self.cells = {}
+        for dentist_id in dentists:
+            row = bytearray(width * len(self.days))
+            for d, day in enumerate(self.days):
+                working = calendar.start_mask(day, dentist_id, 1)
+                taken = booked.get((day, dentist_id), 0)
+                offset = d * width
+                for i in range(width):
+                    bit = 1 << i
+                    if taken & bit:
+                        row[offset + i] = BOOKED
+                    elif working & bit:
+                        row[offset + i] = FREE
+            self.cells[dentist_id] = row
+
+    def day_row(self, dentist_id: int, day_index: int) -> str:
+        """One day for one dentist as a string: "." free, "#" booked, "-" closed."""
+        width = len(self.grid.minutes)
+        chunk = self.cells[dentist_id][day_index * width:(day_index + 1) * width]
+        return bytes(chunk).translate(_CELL_CHARS).decode("ascii")
+
+    def iter_json(self):
+        """Yields the matrix as compact JSON text, one dentist per chunk."""
+        header = {
+            "from": str(self.start),
+            "to": str(self.end),
+            "days": [str(day) for day in self.days],
+            "slots": [format_minutes(m)[:5] for m in self.grid.minutes],
+            "slot_minutes": self.grid.slot_minutes,
+            "legend": {".": "free", "#": "booked", "-": "closed"},
+        }
+        yield json.dumps(header, separators=(",", ":"))[:-1] + ',"dentists":['
+        for n, (dentist_id, name) in enumerate(self.dentists.items()):
+            entry = {
+                "dentist_id": dentist_id,
+                "name": name,
+                "rows": [self.day_row(dentist_id, d) for d in range(len(self.days))],
+            }
+            yield ("," if n else "") + json.dumps(entry, separators=(",", ":"))
+        yield "]}"
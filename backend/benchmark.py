@@ -0,0 +1,461 @@
+# backend/benchmark.py
+"""
+Reproducible benchmarks for the booking and dashboard hot paths.
+
+`seed` fills the database configured in .env (use a local MySQL/MariaDB
+instance, never production) with a deterministic data set: dentists,
+patients and appointments generated from --seed and fed through the
+bulk-import pipeline. Appointments are spread around a fixed --start-date (not
+today), so seeding on different days produces the same rows; the range
+reaches further back than --days-back when --appointments needs more room. Seeded rows are named "Bench ..." so `clean` can remove
+them again. One patient in ten is a walk-in with no history; the booking
+benchmark books for those.
+
+`run` drives a running bridge: check_availability, find_available_slots,
+book_dentist_appointment, then cancel_booking for every booking it made, and
+each read-only /admin/* endpoint. Every scenario reports p50/p95/p99 latency,
+throughput and MySQL round trips per request (read from the bridge's /metrics)
+as JSON. Re-run it as the appointments table grows and compare against an
+earlier report to catch regressions.
+
+    python benchmark.py seed --dentists 8 --patients 20000 --appointments 200000 --seed 42 \\
+        --start-date 2026-01-05 --admin-email bench@example.com --admin-password bench-password
+    python benchmark.py run --concurrency 8 --requests 200 \\
+        --admin-email bench@example.com --admin-password bench-password --output bench.json
+    python benchmark.py run ... --baseline bench.json --max-regression 0.25
+    python benchmark.py clean
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from availability import format_minutes
+from booking_rollups import rebuild_rollups
+from bulk_import import import_appointments, import_patients
+from load_test import percentile
+
+BENCH_PREFIX = "Bench "
+WALK_IN_SHARE = 10  # one patient in this many has no seeded appointments
+DEFAULT_START_DATE = "2026-01-05"  # appointments before it are history, after it are upcoming
+TOOL_SCENARIOS = ("check_availability", "find_available_slots", "book_dentist_appointment", "cancel_booking")
+ADMIN_ENDPOINTS = (
+    "/admin/dashboard", "/admin/stats", "/admin/chart-data", "/admin/todays-bookings",
+    "/admin/monthly-breakdown", "/admin/schedule", "/admin/export/appointments",
+    "/admin/db-pool", "/admin/cache-stats", "/admin/notifications",
+)
+# p95 changes smaller than this are noise, whatever the ratio
+_NOISE_FLOOR_MS = 2.0
+_ROUND_TRIP_LINE = re.compile(r'^dentist_db_round_trips_per_request_(sum|count)\{route="([^"]*)"\} (\S+)$')
+
+
+# --- Seeding ---
+def _phone(index: int) -> str:
+    return f"8{index:09d}"
+
+
+def _bench_dentists(cursor, count: int = None) -> list:
+    """Returns the benchmark dentists' ids, creating missing ones when `count` is given."""
+    cursor.execute("SELECT dentist_id, name FROM dentists WHERE name LIKE %s ORDER BY dentist_id", (BENCH_PREFIX + "Dr %",))
+    existing = {name: dentist_id for dentist_id, name in cursor.fetchall()}
+    if count is not None:
+        missing = [(f"{BENCH_PREFIX}Dr {n}",) for n in range(1, count + 1) if f"{BENCH_PREFIX}Dr {n}" not in existing]
+        if missing:
+            cursor.executemany("INSERT INTO dentists (name) VALUES (%s)", missing)
+            return _bench_dentists(cursor)
+    return sorted(existing.values())
+
+
+def _appointment_cells(calendar, dentist_ids, start: date, end: date):
+    """Every (day, dentist_id, start minute) where a default-length appointment may start."""
+    cells = calendar.cells_for()
+    for day in calendar.open_days(start, end):
+        for dentist_id in dentist_ids:
+            mask = calendar.start_mask(day, dentist_id, cells)
+            for i, minute in enumerate(calendar.grid.minutes):
+                if mask >> i & 1:
+                    yield day, dentist_id, minute
+
+
+def _seed_cells(calendar, dentist_ids, start_date: date, days_back: int, days_ahead: int, needed: int) -> list:
+    """
+    Appointment cells from `days_back` before to `days_ahead` after `start_date`,
+    extended a year further back at a time until `needed` of them fit.
+    """
+    first = start_date - timedelta(days=days_back)
+    cells = list(_appointment_cells(calendar, dentist_ids, first, start_date + timedelta(days=days_ahead)))
+    while len(cells) < needed:
+        earlier = first - timedelta(days=365)
+        extra = list(_appointment_cells(calendar, dentist_ids, earlier, first - timedelta(days=1)))
+        if not extra:
+            raise ValueError(f"Only {len(cells)} appointment slots fit; the clinic calendar has no working hours "
+                             f"for the benchmark dentists.")
+        cells = extra + cells
+        first = earlier
+    return cells
+
+
+def seed(conn, calendar, dentists: int, patients: int, appointments: int, days_back: int, days_ahead: int,
+         seed_value: int, progress=None, start_date: date = None) -> dict:
+    """
+    Generates the data set for `seed_value` around `start_date` and imports it.
+    Re-running with the same arguments adds nothing.
+    """
+    start_date = start_date or date.fromisoformat(DEFAULT_START_DATE)
+    rng = random.Random(seed_value)
+    cursor = conn.cursor()
+    try:
+        dentist_ids = _bench_dentists(cursor, dentists)[:dentists]
+        conn.commit()
+    finally:
+        cursor.close()
+
+    patient_records = [
+        {
+            "full_name": f"{BENCH_PREFIX}{'Walk-in' if n % WALK_IN_SHARE == 0 else 'Patient'} {n}",
+            "date_of_birth": date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 65)),
+            "phone": _phone(n),
+            "gender": rng.choice(("Male", "Female")),
+        }
+        for n in range(1, patients + 1)
+    ]
+    regulars = [record["phone"] for n, record in enumerate(patient_records, start=1) if n % WALK_IN_SHARE]
+    if appointments and not regulars:
+        raise ValueError("Seed at least two patients so some have appointment history.")
+
+    cells = _seed_cells(calendar, dentist_ids, start_date, days_back, days_ahead, appointments)
+    appointment_records = []
+    for i in sorted(rng.sample(range(len(cells)), appointments)):
+        day, dentist_id, minute = cells[i]
+        if day < start_date:
+            status = "Completed" if rng.random() < 0.85 else "Cancelled"
+        else:
+            status = "Scheduled" if rng.random() < 0.9 else "Cancelled"
+        appointment_records.append({
+            "phone": rng.choice(regulars),
+            "dentist_id": dentist_id,
+            "appointment_date": day.isoformat(),
+            "appointment_start_time": format_minutes(minute),
+            "duration_minutes": calendar.default_duration,
+            "status": status,
+            "reason": "Benchmark",
+        })
+
+    return {
+        "dentists": dentist_ids,
+        "patients": import_patients(conn, patient_records, progress=progress),
+        "appointments": import_appointments(conn, appointment_records, progress=progress),
+    }
+
+
+def clean(conn) -> dict:
+    """Deletes every seeded row (and anything booked for or with them), then rebuilds the rollups."""
+    like = BENCH_PREFIX + "%"
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE a FROM appointments a JOIN patients p ON p.patient_id = a.patient_id WHERE p.full_name LIKE %s", (like,))
+        removed = cursor.rowcount
+        cursor.execute("DELETE a FROM appointments a JOIN dentists d ON d.dentist_id = a.dentist_id WHERE d.name LIKE %s", (like,))
+        removed += cursor.rowcount
+        cursor.execute("DELETE FROM patients WHERE full_name LIKE %s", (like,))
+        patients = cursor.rowcount
+        cursor.execute("DELETE FROM dentists WHERE name LIKE %s", (like,))
+        dentists = cursor.rowcount
+        conn.commit()
+    finally:
+        cursor.close()
+    rebuild_rollups(conn)
+    return {"appointments": removed, "patients": patients, "dentists": dentists}
+
+
+# --- Driving the bridge ---
+def _request(base_url: str, method: str, path: str, body=None, token: str = None, timeout: float = 30.0):
+    """Returns (latency seconds, HTTP status or None, parsed JSON body for tool calls)."""
+    data = json.dumps(body).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if data else {}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(base_url + path, data=data, headers=headers, method=method)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = response.read()
+            code = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return time.perf_counter() - started, e.code, None
+    except (urllib.error.URLError, TimeoutError):
+        return time.perf_counter() - started, None, None
+    latency = time.perf_counter() - started
+    result = None
+    if path.startswith("/tools/"):
+        try:
+            result = json.loads(payload)
+        except ValueError:
+            pass
+    return latency, code, result
+
+
+def _admin_token(base_url: str, email: str, password: str) -> str:
+    form = urllib.parse.urlencode({"username": email, "password": password}).encode()
+    request = urllib.request.Request(base_url + "/admin/token", data=form, method="POST",
+                                     headers={"Content-Type": "application/x-www-form-urlencoded"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())["access_token"]
+
+
+def _round_trip_totals(base_url: str) -> dict:
+    """{route: [sum, count]} of MySQL round trips per request, from /metrics."""
+    with urllib.request.urlopen(base_url + "/metrics", timeout=30) as response:
+        text = response.read().decode()
+    totals = {}
+    for line in text.splitlines():
+        match = _ROUND_TRIP_LINE.match(line)
+        if match:
+            kind, route, value = match.groups()
+            totals.setdefault(route, [0.0, 0.0])[0 if kind == "sum" else 1] = float(value)
+    return totals
+
+
+def run_scenario(base_url: str, name: str, route: str, calls, concurrency: int, token: str = None,
+                 timeout: float = 30.0, warmup: int = 0) -> tuple:
+    """
+    Sends every (method, path, body) in `calls` with `concurrency` parallel clients.
+    Returns (report, [(call, parsed result)]) so later scenarios can reuse what this one created.
+    """
+    for method, path, body in calls[:warmup]:
+        _request(base_url, method, path, body, token, timeout)
+    measured = calls[warmup:]
+    before = _round_trip_totals(base_url)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        responses = list(pool.map(lambda call: _request(base_url, *call, token=token, timeout=timeout), measured))
+    elapsed = time.perf_counter() - started
+    after = _round_trip_totals(base_url)
+
+    latencies = sorted(latency for latency, code, _ in responses if code == 200)
+    outcomes = {}
+    for _, code, result in responses:
+        key = (result or {}).get("status") or (f"HTTP {code}" if code else "unreachable")
+        outcomes[key] = outcomes.get(key, 0) + 1
+    trips_sum, trips_count = (after.get(route, [0, 0])[i] - before.get(route, [0, 0])[i] for i in (0, 1))
+    report = {
+        "scenario": name,
+        "route": route,
+        "requests": len(measured),
+        "concurrency": concurrency,
+        "errors": sum(1 for _, code, _ in responses if code != 200),
+        "outcomes": outcomes,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "db_queries_per_request": round(trips_sum / trips_count, 2) if trips_count else None,
+    }
+    return report, list(zip(measured, (result for _, _, result in responses)))
+
+
+def _future_days(calendar, days_ahead: int) -> list:
+    today = date.today()
+    return list(calendar.open_days(today + timedelta(days=1), today + timedelta(days=days_ahead)))
+
+
+def tool_calls(scenario: str, rng, calendar, dentist_ids, walk_ins, days_ahead: int, requests: int, booked=()) -> list:
+    """The deterministic (method, path, body) list for one tool scenario."""
+    days = _future_days(calendar, days_ahead)
+    if scenario == "check_availability":
+        return [("POST", "/tools/check-availability", {"appointment_date": rng.choice(days).isoformat()})
+                for _ in range(requests)]
+    if scenario == "find_available_slots":
+        return [("POST", "/tools/check-availability", {
+                    "appointment_date": rng.choice(days).isoformat(), "count": 3,
+                    "time_preference": rng.choice((None, "morning", "afternoon")),
+                }) for _ in range(requests)]
+    if scenario == "book_dentist_appointment":
+        calls, cells = [], calendar.cells_for()
+        for _ in range(requests):
+            day, dentist_id = rng.choice(days), rng.choice(dentist_ids)
+            mask = calendar.start_mask(day, dentist_id, cells)
+            starts = [minute for i, minute in enumerate(calendar.grid.minutes) if mask >> i & 1]
+            if not starts:
+                continue
+            patient_id, _ = rng.choice(walk_ins)
+            calls.append(("POST", "/tools/book-dentist-appointment", {
+                "patient_id": patient_id, "dentist_id": dentist_id,
+                "appointment_date": day.isoformat(), "appointment_start_time": format_minutes(rng.choice(starts)),
+            }))
+        return calls
+    if scenario == "cancel_booking":
+        return [("POST", "/tools/cancel-booking", {"phone": phone, "appointment_date": day})
+                for phone, day in sorted(set(booked))]
+    raise ValueError(f"Unknown scenario '{scenario}'.")
+
+
+def run(conn, calendar, base_url: str, scenarios, concurrency: int, requests: int, days_ahead: int, seed_value: int,
+        token: str = None, timeout: float = 30.0, warmup: int = 5) -> dict:
+    cursor = conn.cursor()
+    try:
+        dentist_ids = _bench_dentists(cursor)
+        cursor.execute("SELECT patient_id, phone FROM patients WHERE full_name LIKE %s ORDER BY patient_id",
+                       (BENCH_PREFIX + "Walk-in %",))
+        walk_ins = cursor.fetchall()
+        cursor.execute("SELECT COUNT(*) FROM appointments")
+        appointment_rows = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if not dentist_ids or not walk_ins:
+        raise ValueError("No benchmark data found; run `python benchmark.py seed` first.")
+
+    rng = random.Random(seed_value)
+    results, booked = [], []
+    phones = dict(walk_ins)
+    for scenario in scenarios:
+        if scenario in TOOL_SCENARIOS:
+            calls = tool_calls(scenario, rng, calendar, dentist_ids, walk_ins, days_ahead, requests + warmup, booked)
+            if not calls:
+                continue
+            # Cancelling only undoes this run's bookings; nothing to warm up on
+            scenario_warmup = 0 if scenario == "cancel_booking" else warmup
+            report, responses = run_scenario(base_url, scenario, calls[0][1], calls, concurrency,
+                                             timeout=timeout, warmup=scenario_warmup)
+            if scenario == "book_dentist_appointment":
+                booked = [(phones[body["patient_id"]], body["appointment_date"])
+                          for (_, _, body), result in responses if (result or {}).get("status") == "Success"]
+        else:
+            if not token:
+                print(f"Skipping {scenario}: pass --admin-email and --admin-password", file=sys.stderr)
+                continue
+            calls = [("GET", scenario, None)] * (requests + warmup)
+            report, _ = run_scenario(base_url, scenario, scenario, calls, concurrency, token, timeout, warmup)
+        results.append(report)
+
+    return {
+        "meta": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "base_url": base_url,
+            "seed": seed_value,
+            "concurrency": concurrency,
+            "requests_per_scenario": requests,
+            "appointment_rows": appointment_rows,
+            "bench_dentists": len(dentist_ids),
+        },
+        "results": results,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    """Scenarios whose p95 grew by more than `max_regression` (a fraction) or that now make more queries."""
+    previous = {result["scenario"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get(result["scenario"])
+        if not old:
+            continue
+        if result["p95_ms"] > old["p95_ms"] * (1 + max_regression) and result["p95_ms"] - old["p95_ms"] > _NOISE_FLOOR_MS:
+            regressions.append(f"{result['scenario']}: p95 {old['p95_ms']} -> {result['p95_ms']} ms")
+        if (result["db_queries_per_request"] or 0) > (old["db_queries_per_request"] or 0) + 0.5:
+            regressions.append(f"{result['scenario']}: queries/request {old['db_queries_per_request']} -> {result['db_queries_per_request']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed benchmark data and benchmark the bridge's hot paths.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = subcommands.add_parser("seed", help="Generate and import a deterministic data set")
+    seed_parser.add_argument("--dentists", type=int, default=8)
+    seed_parser.add_argument("--patients", type=int, default=5000)
+    seed_parser.add_argument("--appointments", type=int, default=50000)
+    seed_parser.add_argument("--days-back", type=int, default=365,
+                             help="History before --start-date; extended when --appointments needs more room")
+    seed_parser.add_argument("--days-ahead", type=int, default=30)
+    seed_parser.add_argument("--start-date", type=date.fromisoformat, default=DEFAULT_START_DATE,
+                             help="Fixed reference day (YYYY-MM-DD) so re-seeding gives the same rows")
+    seed_parser.add_argument("--seed", type=int, default=42)
+    seed_parser.add_argument("--admin-email", help="Also create this admin user for the /admin/* scenarios")
+    seed_parser.add_argument("--admin-password")
+
+    run_parser = subcommands.add_parser("run", help="Benchmark a running bridge server")
+    run_parser.add_argument("--base-url", default="http://localhost:8000")
+    run_parser.add_argument("--scenarios", default=",".join(TOOL_SCENARIOS + ADMIN_ENDPOINTS),
+                            help="Comma-separated tool scenarios and /admin/* paths, run in this order")
+    run_parser.add_argument("--concurrency", type=int, default=8)
+    run_parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    run_parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests sent first per scenario")
+    run_parser.add_argument("--days-ahead", type=int, default=14, help="Dates searched and booked")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--timeout", type=float, default=30.0)
+    run_parser.add_argument("--admin-email")
+    run_parser.add_argument("--admin-password")
+    run_parser.add_argument("--output", help="Write the JSON report to this file")
+    run_parser.add_argument("--baseline", help="Earlier JSON report to compare against; exits 1 on regressions")
+    run_parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed p95 growth (0.25 = 25%%)")
+
+    subcommands.add_parser("clean", help="Delete every seeded row")
+    args = parser.parse_args()
+
+    from dentist_mcp_server import CLINIC_CALENDAR, create_admin_user, db_pool
+
+    if args.command == "seed":
+        def progress(summary):
+            print(f"   • {summary['kind']}: {summary['rows']} rows, {summary['inserted']} inserted "
+                  f"({summary['rows_per_second']} rows/s)")
+
+        with db_pool.connection() as conn:
+            summary = seed(conn, CLINIC_CALENDAR, args.dentists, args.patients, args.appointments,
+                           args.days_back, args.days_ahead, args.seed, progress, args.start_date)
+        if args.admin_email and args.admin_password:
+            create_admin_user(args.admin_email, args.admin_password)
+        print(f"✅ Seeded {len(summary['dentists'])} dentists, {summary['patients']['inserted']} patients "
+              f"and {summary['appointments']['inserted']} appointments.")
+    elif args.command == "clean":
+        with db_pool.connection() as conn:
+            removed = clean(conn)
+        print(f"✅ Removed {removed['appointments']} appointments, {removed['patients']} patients "
+              f"and {removed['dentists']} dentists.")
+    else:
+        base_url = args.base_url.rstrip("/")
+        token = _admin_token(base_url, args.admin_email, args.admin_password) if args.admin_email else None
+        scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+        with db_pool.connection() as conn:
+            report = run(conn, CLINIC_CALENDAR, base_url, scenarios, args.concurrency, args.requests,
+                         args.days_ahead, args.seed, token, args.timeout, args.warmup)
+        print(f"{'scenario':<28} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}", file=sys.stderr)
+        for r in report["results"]:
+            print(f"{r['scenario']:<28} {r['throughput_rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+                  f"{r['db_queries_per_request'] if r['db_queries_per_request'] is not None else '-':>8} {r['errors']:>7}",
+                  file=sys.stderr)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        else:
+            print(json.dumps(report))
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                regressions = compare(report, json.load(f), args.max_regression)
+            for regression in regressions:
+                print(f"  - ❌ Regression in {regression}", file=sys.stderr)
+            if regressions:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# backend/booking_rollups.py
+"""
+Per-day, per-dentist, per-status appointment counters.
+
+book_dentist_appointment and cancel_booking adjust the counters inside their
+own transactions, so dashboard reads are O(days) lookups on this table
+instead of COUNT(*) scans over the whole appointments history.
+
+Rebuild from scratch (e.g. after editing appointments by hand):
+
+    python booking_rollups.py backfill
+    python booking_rollups.py backfill --from 2025-01-01
+"""
+import argparse
+from datetime import datetime
+
+from mysql.connector import errors
+
+import metrics
+from db_pool import MISSING_TABLE_ERRNO
+from structured_logging import get_logger
+
+log = get_logger("rollups")
+
+ROLLUP_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS appointment_daily_rollup (
+        rollup_date DATE NOT NULL,
+        dentist_id INT NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        bookings INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (rollup_date, dentist_id, status)
+    )
+"""
+
+_warned_missing_table = False
+
+
+def _warn_missing_table():
+    global _warned_missing_table
+    if not _warned_missing_table:
+        _warned_missing_table = True
+        log.warning("appointment_daily_rollup is missing; run `python booking_rollups.py backfill`")
+
+
+def apply_rollup_delta(cursor, rollup_date, dentist_id: int, status: str, delta: int):
+    """Adds `delta` to one counter. Runs on the caller's cursor, inside its transaction."""
+    query = """
+        INSERT INTO appointment_daily_rollup (rollup_date, dentist_id, status, bookings)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE bookings = bookings + VALUES(bookings)
+    """
+    try:
+        cursor.execute(query, (rollup_date, dentist_id, status, delta))
+    except errors.ProgrammingError as err:
+        # The appointment write matters more than its dashboard counter
+        if err.errno != MISSING_TABLE_ERRNO:
+            raise
+        _warn_missing_table()
+
+
+ROLLUP_COUNTS_QUERY = """
+    SELECT rollup_date, status, SUM(bookings) AS bookings
+    FROM appointment_daily_rollup
+    WHERE rollup_date >= %s
+    GROUP BY rollup_date, status
+"""
+
+metrics.name_queries(globals())
+
+
+def load_daily_status_counts(cursor, since) -> dict:
+    """
+    Returns {(date, status): count} for every day on or after `since`,
+    or None if the rollup table does not exist yet.
+    """
+    try:
+        cursor.execute(ROLLUP_COUNTS_QUERY, (since,))
+    except errors.ProgrammingError as err:
+        if err.errno != MISSING_TABLE_ERRNO:
+            raise
+        _warn_missing_table()
+        return None
+    return {(row['rollup_date'], row['status']): int(row['bookings']) for row in cursor.fetchall()}
+
+
+def rebuild_rollups(conn, since=None) -> int:
+    """Recomputes counters from appointments in one transaction. Returns the number of rows written."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(ROLLUP_TABLE_DDL)
+        conn.start_transaction()
+        if since:
+            cursor.execute("DELETE FROM appointment_daily_rollup WHERE rollup_date >= %s", (since,))
+        else:
+            cursor.execute("DELETE FROM appointment_daily_rollup")
+        cursor.execute(
+            f"""
+            INSERT INTO appointment_daily_rollup (rollup_date, dentist_id, status, bookings)
+            SELECT appointment_date, dentist_id, status, COUNT(*)
+            FROM appointments
+            {"WHERE appointment_date >= %s" if since else ""}
+            GROUP BY appointment_date, dentist_id, status
+            """,
+            (since,) if since else (),
+        )
+        written = cursor.rowcount
+        conn.commit()
+        return written
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the appointment_daily_rollup table.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill = subcommands.add_parser("backfill", help="Rebuild counters from the appointments table")
+    backfill.add_argument("--from", dest="since", help="Only rebuild days on or after YYYY-MM-DD")
+    args = parser.parse_args()
+
+    from dentist_mcp_server import db_pool
+
+    since = datetime.strptime(args.since, "%Y-%m-%d").date() if args.since else None
+    with db_pool.connection() as conn:
+        print("⏳ Rebuilding appointment_daily_rollup...")
+        written = rebuild_rollups(conn, since)
+    print(f"✅ Wrote {written} rollup rows.")
+
+
+if __name__ == "__main__":
+    main()
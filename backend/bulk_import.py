@@ -0,0 +1,346 @@
+# backend/bulk_import.py
+"""
+Bulk import of existing clinic records (patients, then their appointments).
+
+Rows are validated and normalized in Python, deduplicated per chunk with one
+IN (...) lookup, and written with executemany in one transaction per chunk,
+so a large file costs a few round trips per thousand rows instead of one
+connection per row.
+
+    python bulk_import.py patients patients.csv
+    python bulk_import.py appointments appointments.ndjson --format ndjson --chunk-size 2000
+
+Patients:     full_name, date_of_birth (YYYY-MM-DD), phone[, gender, address]
+Appointments: phone, dentist_id, appointment_date, appointment_start_time
+              [, appointment_end_time | duration_minutes, status, reason]
+
+Patients are matched on the normalized phone number, so run
+`python schema_migrations.py migrate` first.
+
+Unreadable lines and rows the database rejects (e.g. an unknown dentist_id)
+are reported per row like validation errors; the rest of the file still imports.
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from datetime import datetime
+
+from mysql.connector import errors
+
+from availability import format_minutes, to_minutes
+from booking_rollups import rebuild_rollups
+from phone_numbers import normalize_phone
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+DEFAULT_DURATION_MINUTES = 30
+APPOINTMENT_STATUSES = {"Scheduled", "Completed", "Cancelled"}
+
+
+def read_records(stream, import_format: str = "csv"):
+    """
+    Yields one dict per CSV row or NDJSON line. An NDJSON line that isn't valid
+    JSON is yielded as a ValueError, so the importer reports it as a failed row.
+    """
+    if import_format == "csv":
+        for record in csv.DictReader(stream):
+            yield {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in record.items() if k}
+    elif import_format == "ndjson":
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield ValueError(f"invalid JSON ({e.msg} at column {e.colno})")
+    else:
+        raise ValueError(f"Unknown import format '{import_format}' (use csv or ndjson).")
+
+
+def _chunks(records, size: int):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _as_record(record) -> dict:
+    if isinstance(record, ValueError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError(f"expected an object, got {type(record).__name__}")
+    return record
+
+
+def _insert_chunk(conn, cursor, statement: str, numbered_rows, report) -> list:
+    """
+    Inserts a chunk with one executemany and commits it. If the database
+    rejects the batch (a foreign key or an out-of-range value in some row), it
+    is retried row by row so only the offending rows fail. Returns the rows inserted.
+    """
+    rows = [row for _, row in numbered_rows]
+    try:
+        if rows:
+            cursor.executemany(statement, rows)
+        conn.commit()
+        return rows
+    except (errors.IntegrityError, errors.DataError):
+        conn.rollback()
+    inserted = []
+    for row_number, row in numbered_rows:
+        try:
+            cursor.execute(statement, row)
+        except (errors.IntegrityError, errors.DataError) as e:
+            # InnoDB only undoes the failed statement; the rest of the chunk stays
+            report.error(row_number, str(e))
+            continue
+        inserted.append(row)
+    conn.commit()
+    return inserted
+
+
+def _required(record: dict, field: str) -> str:
+    value = record.get(field)
+    if value is None or str(value).strip() == "":
+        raise ValueError(f"missing {field}")
+    return str(value).strip()
+
+
+def _parse_date(value: str):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _existing_phones(cursor, phones) -> set:
+    if not phones:
+        return set()
+    placeholders = ", ".join(["%s"] * len(phones))
+    cursor.execute(f"SELECT phone_normalized FROM patients WHERE phone_normalized IN ({placeholders})", tuple(phones))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _patient_ids(cursor, phones) -> dict:
+    if not phones:
+        return {}
+    placeholders = ", ".join(["%s"] * len(phones))
+    cursor.execute(
+        f"SELECT phone_normalized, MIN(patient_id) FROM patients WHERE phone_normalized IN ({placeholders}) "
+        "GROUP BY phone_normalized",
+        tuple(phones),
+    )
+    return dict(cursor.fetchall())
+
+
+class _Report:
+    def __init__(self, kind: str, progress=None):
+        self.kind = kind
+        self.progress = progress
+        self.started = time.perf_counter()
+        self.counts = {"rows": 0, "inserted": 0, "duplicates": 0, "failed": 0}
+        self.errors = []
+
+    def error(self, row_number: int, message: str):
+        self.counts["failed"] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def chunk_done(self):
+        if self.progress:
+            self.progress(self.summary())
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "kind": self.kind,
+            **self.counts,
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(self.counts["rows"] / elapsed, 1) if elapsed else 0.0,
+            "errors": list(self.errors),
+        }
+
+
+def import_patients(conn, records, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None) -> dict:
+    """
+    Inserts new patients, skipping phone numbers that already exist (in the
+    table or earlier in the file). Returns a summary with per-row errors.
+    """
+    report = _Report("patients", progress)
+    seen = set()
+    cursor = conn.cursor(buffered=True)
+    try:
+        for chunk in _chunks(enumerate(records, start=1), chunk_size):
+            rows = []
+            for row_number, record in chunk:
+                report.counts["rows"] += 1
+                try:
+                    record = _as_record(record)
+                    full_name = _required(record, "full_name")
+                    date_of_birth = _parse_date(_required(record, "date_of_birth"))
+                    phone = _required(record, "phone")
+                    normalized = normalize_phone(phone)
+                    if not normalized:
+                        raise ValueError(f"unusable phone '{phone}'")
+                except ValueError as e:
+                    report.error(row_number, str(e))
+                    continue
+                if normalized in seen:
+                    report.counts["duplicates"] += 1
+                    continue
+                seen.add(normalized)
+                rows.append((row_number, (full_name, date_of_birth, phone, normalized,
+                                          record.get("gender") or None, record.get("address") or None)))
+            existing = _existing_phones(cursor, [row[3] for _, row in rows])
+            new_rows = [(row_number, row) for row_number, row in rows if row[3] not in existing]
+            report.counts["duplicates"] += len(rows) - len(new_rows)
+            inserted = _insert_chunk(
+                conn, cursor,
+                "INSERT INTO patients (full_name, date_of_birth, phone, phone_normalized, gender, address) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                new_rows, report,
+            )
+            report.counts["inserted"] += len(inserted)
+            report.chunk_done()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return report.summary()
+
+
+def import_appointments(conn, records, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None) -> dict:
+    """
+    Inserts appointments for patients identified by phone number, skipping
+    rows that repeat an existing (patient, dentist, date, start time).
+    Rebuilds the dashboard rollups for the imported dates afterwards.
+    Imported rows are historical records, so they are not checked for overlaps.
+    """
+    report = _Report("appointments", progress)
+    earliest = None
+    cursor = conn.cursor(buffered=True)
+    try:
+        for chunk in _chunks(enumerate(records, start=1), chunk_size):
+            parsed = []
+            for row_number, record in chunk:
+                report.counts["rows"] += 1
+                try:
+                    record = _as_record(record)
+                    phone = normalize_phone(_required(record, "phone"))
+                    if not phone:
+                        raise ValueError(f"unusable phone '{record.get('phone')}'")
+                    dentist_id = int(_required(record, "dentist_id"))
+                    day = _parse_date(_required(record, "appointment_date"))
+                    start = to_minutes(_required(record, "appointment_start_time"))
+                    if record.get("appointment_end_time"):
+                        end = to_minutes(record["appointment_end_time"])
+                    else:
+                        end = start + int(record.get("duration_minutes") or DEFAULT_DURATION_MINUTES)
+                    if end <= start:
+                        raise ValueError("appointment ends before it starts")
+                    status = str(record.get("status") or "Scheduled").strip().capitalize()
+                    if status not in APPOINTMENT_STATUSES:
+                        raise ValueError(f"unknown status '{status}'")
+                except (ValueError, IndexError, TypeError) as e:
+                    report.error(row_number, str(e))
+                    continue
+                parsed.append((row_number, phone, dentist_id, day, start, end, status, record.get("reason") or None))
+
+            patient_ids = _patient_ids(cursor, sorted({row[1] for row in parsed}))
+            rows = []
+            for row_number, phone, dentist_id, day, start, end, status, reason in parsed:
+                patient_id = patient_ids.get(phone)
+                if patient_id is None:
+                    report.error(row_number, f"no patient with phone {phone}")
+                    continue
+                rows.append((row_number, (dentist_id, patient_id, day, format_minutes(start), format_minutes(end), status, reason)))
+
+            existing = set()
+            if rows:
+                placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(rows))
+                cursor.execute(
+                    "SELECT patient_id, dentist_id, appointment_date, appointment_start_time FROM appointments "
+                    f"WHERE (patient_id, dentist_id, appointment_date, appointment_start_time) IN ({placeholders})",
+                    tuple(v for _, row in rows for v in (row[1], row[0], row[2], row[3])),
+                )
+                existing = {(p, d, day, format_minutes(to_minutes(t))) for p, d, day, t in cursor.fetchall()}
+            new_rows, keys = [], set()
+            for row_number, row in rows:
+                key = (row[1], row[0], row[2], row[3])
+                if key in existing or key in keys:
+                    report.counts["duplicates"] += 1
+                    continue
+                keys.add(key)
+                new_rows.append((row_number, row))
+            inserted = _insert_chunk(
+                conn, cursor,
+                "INSERT INTO appointments (dentist_id, patient_id, appointment_date, appointment_start_time, "
+                "appointment_end_time, status, reason) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                new_rows, report,
+            )
+            if inserted:
+                chunk_earliest = min(row[2] for row in inserted)
+                earliest = chunk_earliest if earliest is None else min(earliest, chunk_earliest)
+            report.counts["inserted"] += len(inserted)
+            report.chunk_done()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    if earliest is not None:
+        rebuild_rollups(conn, since=earliest)
+    return report.summary()
+
+
+IMPORTERS = {"patients": import_patients, "appointments": import_appointments}
+
+
+def run_import(conn, kind: str, stream, import_format: str = "csv",
+               chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None) -> dict:
+    """Imports `kind` ("patients" or "appointments") records from a text stream."""
+    if kind not in IMPORTERS:
+        raise ValueError(f"Unknown import kind '{kind}' (use patients or appointments).")
+    records = read_records(stream, import_format)
+    return IMPORTERS[kind](conn, records, chunk_size=chunk_size, progress=progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import patients or appointments from CSV/NDJSON.")
+    parser.add_argument("kind", choices=sorted(IMPORTERS))
+    parser.add_argument("path", help="File to import ('-' for stdin)")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension, else csv")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    from dentist_mcp_server import db_pool
+
+    import_format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+
+    def progress(summary):
+        print(f"   • {summary['rows']} rows read, {summary['inserted']} inserted, "
+              f"{summary['duplicates']} duplicates, {summary['failed']} failed "
+              f"({summary['rows_per_second']} rows/s)")
+
+    stream = sys.stdin if args.path == "-" else io.open(args.path, encoding="utf-8-sig", newline="")
+    try:
+        with db_pool.connection() as conn:
+            print(f"⏳ Importing {args.kind} from {args.path}...")
+            summary = run_import(conn, args.kind, stream, import_format, args.chunk_size, progress)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    for error in summary["errors"]:
+        print(f"  - ❌ row {error['row']}: {error['error']}")
+    if summary["failed"] > len(summary["errors"]):
+        print(f"  - ... and {summary['failed'] - len(summary['errors'])} more errors")
+    print(f"✅ Imported {summary['inserted']} {args.kind} in {summary['seconds']}s "
+          f"({summary['duplicates']} duplicates skipped, {summary['failed']} failed).")
+
+
+if __name__ == "__main__":
+    main()
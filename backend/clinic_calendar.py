@@ -0,0 +1,179 @@
+# backend/clinic_calendar.py
+"""
+The clinic's calendar: weekly working hours, breaks and holidays (clinic-wide
+and per dentist) plus appointment durations.
+
+The configuration is compiled once into a uniform SlotGrid (every multiple of
+`slot_minutes` between the earliest opening and the latest closing time) and,
+per dentist and weekday, into integer templates: bit i is set when an
+appointment of a given length can start at grid slot i. Searches only AND
+these templates with booked-slot bitmaps; nothing is parsed per call.
+
+Configuration is JSON (CLINIC_CALENDAR_PATH, see clinic_calendar.example.json).
+Missing keys fall back to DEFAULT_CALENDAR, which is the clinic's original
+Mon-Sat, 10:00-13:00 and 14:00-17:00 schedule in 30-minute slots.
+"""
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from availability import SlotGrid, to_minutes
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+DEFAULT_CALENDAR = {
+    "slot_minutes": 30,
+    "default_duration_minutes": 30,
+    "working_hours": {day: [["10:00", "13:00"], ["14:00", "17:00"]] for day in WEEKDAYS[:6]},
+    "breaks": [],
+    "holidays": [],
+    "appointment_types": {},
+    "dentists": {},
+}
+
+
+def _parse_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+def _check_weekdays(hours: dict, where: str):
+    unknown = sorted(set(hours) - set(WEEKDAYS))
+    if unknown:
+        raise ValueError(f"Unknown weekday {', '.join(map(repr, unknown))} in {where} (use {', '.join(WEEKDAYS)}).")
+
+
+def _subtract(intervals, breaks):
+    """Removes every break from a list of (start, end) minute intervals."""
+    result = list(intervals)
+    for b_start, b_end in breaks:
+        pieces = []
+        for start, end in result:
+            if b_end <= start or b_start >= end:
+                pieces.append((start, end))
+                continue
+            if start < b_start:
+                pieces.append((start, b_start))
+            if b_end < end:
+                pieces.append((b_end, end))
+        result = pieces
+    return result
+
+
+class ClinicCalendar:
+    """Compiled working-time templates for every dentist and weekday."""
+
+    def __init__(self, config: dict = None):
+        config = {**DEFAULT_CALENDAR, **(config or {})}
+        self.slot_minutes = int(config["slot_minutes"])
+        if self.slot_minutes <= 0:
+            raise ValueError("slot_minutes must be positive")
+        self.default_duration = int(config["default_duration_minutes"])
+        self.appointment_types = {
+            name.strip().lower(): int(minutes) for name, minutes in config["appointment_types"].items()
+        }
+        self.holidays = frozenset(_parse_date(d) for d in config["holidays"])
+
+        _check_weekdays(config["working_hours"], "working_hours")
+        base_hours = {day: config["working_hours"].get(day, []) for day in WEEKDAYS}
+        base_breaks = [tuple(b) for b in config["breaks"]]
+        # None is the clinic-wide schedule, used for dentists without overrides
+        schedules = {None: (base_hours, base_breaks, frozenset())}
+        for dentist_id, override in config["dentists"].items():
+            _check_weekdays(override.get("working_hours", {}), f"dentists.{dentist_id}.working_hours")
+            hours = {**base_hours, **override.get("working_hours", {})}
+            breaks = base_breaks + [tuple(b) for b in override.get("breaks", [])]
+            holidays = frozenset(_parse_date(d) for d in override.get("holidays", []))
+            schedules[int(dentist_id)] = (hours, breaks, holidays)
+
+        # Open intervals per (schedule, weekday), snapped inwards to the slot size
+        step = self.slot_minutes
+        self._open = {}
+        self._dentist_holidays = {}
+        for key, (hours, breaks, holidays) in schedules.items():
+            self._dentist_holidays[key] = holidays
+            break_minutes = [(to_minutes(s), to_minutes(e)) for s, e in breaks]
+            for weekday, day_name in enumerate(WEEKDAYS):
+                intervals = [(to_minutes(s), to_minutes(e)) for s, e in hours[day_name]]
+                snapped = []
+                for start, end in sorted(_subtract(intervals, break_minutes)):
+                    start = -(-start // step) * step
+                    end = end // step * step
+                    if start < end:
+                        snapped.append((start, end))
+                self._open[(key, weekday)] = tuple(snapped)
+
+        bounds = [m for intervals in self._open.values() for interval in intervals for m in interval]
+        first, last = (min(bounds), max(bounds)) if bounds else (0, 0)
+        self.grid = SlotGrid(range(first, last, step), slot_minutes=step)
+        self._templates = {}
+        self._templates_lock = threading.Lock()
+
+    # --- Durations ---
+    def duration_for(self, appointment_type: str = None) -> int:
+        """Returns the length in minutes of an appointment type (the default when None)."""
+        if not appointment_type:
+            return self.default_duration
+        key = appointment_type.strip().lower()
+        if key not in self.appointment_types:
+            known = ", ".join(sorted(self.appointment_types)) or "none configured"
+            raise ValueError(f"Unknown appointment type '{appointment_type}' (known: {known}).")
+        return self.appointment_types[key]
+
+    def cells_for(self, duration_minutes: int = None) -> int:
+        """Number of consecutive grid slots an appointment of this length occupies."""
+        duration = self.default_duration if duration_minutes is None else int(duration_minutes)
+        return max(1, -(-duration // self.slot_minutes))
+
+    # --- Templates ---
+    def _schedule_key(self, dentist_id):
+        return dentist_id if (dentist_id, 0) in self._open else None
+
+    def _template(self, key, weekday: int, cells: int) -> int:
+        template = self._templates.get((key, weekday, cells))
+        if template is not None:
+            return template
+        span = cells * self.slot_minutes
+        template = 0
+        for start, end in self._open[(key, weekday)]:
+            for minute in range(start, end - span + 1, self.slot_minutes):
+                template |= 1 << self.grid.index[minute]
+        with self._templates_lock:
+            self._templates[(key, weekday, cells)] = template
+        return template
+
+    def start_mask(self, day: date, dentist_id: int, cells: int = 1) -> int:
+        """Mask of grid slots where an appointment `cells` slots long may start."""
+        key = self._schedule_key(dentist_id)
+        if day in self.holidays or day in self._dentist_holidays[key]:
+            return 0
+        return self._template(key, day.weekday(), cells)
+
+    def is_bookable(self, day: date, dentist_id: int, minute: int, duration_minutes: int = None) -> bool:
+        i = self.grid.index.get(minute)
+        return i is not None and bool(self.start_mask(day, dentist_id, self.cells_for(duration_minutes)) >> i & 1)
+
+    def open_days(self, start: date, end: date):
+        """Yields the days in [start, end] on which anyone works."""
+        keys = {key for key, _ in self._open}
+        current = start
+        while current <= end:
+            if current not in self.holidays and any(self._open[(key, current.weekday())] for key in keys):
+                yield current
+            current += timedelta(days=1)
+
+
+def load_calendar(path: str = None, required: bool = False) -> ClinicCalendar:
+    """
+    Loads the calendar from a JSON file, or the built-in default schedule if
+    there is none. With `required` (the path was configured explicitly) a
+    missing file is an error rather than a silent fallback.
+    """
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return ClinicCalendar(json.load(f))
+    if required:
+        raise FileNotFoundError(f"Clinic calendar '{path}' does not exist (check CLINIC_CALENDAR_PATH).")
+    return ClinicCalendar()
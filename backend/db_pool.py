@@ -0,0 +1,215 @@
+# backend/db_pool.py
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import errors
+
+import metrics
+
+# MySQL errors that mean `python schema_migrations.py migrate` hasn't run yet;
+# callers fall back to the pre-migration behaviour instead of failing
+UNKNOWN_COLUMN_ERRNO = 1054
+MISSING_TABLE_ERRNO = 1146
+
+
+class _TimedCursor:
+    """Cursor wrapper that records every execute() as one query round trip."""
+
+    __slots__ = ("_cursor",)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            metrics.observe_query(operation, time.perf_counter() - started)
+
+    def executemany(self, operation, seq_params):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params)
+        finally:
+            metrics.observe_query(operation, time.perf_counter() - started)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _TimedConnection:
+    """Connection wrapper whose cursors are timed; everything else goes to the real connection."""
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return _TimedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class ConnectionPool:
+    """
+    A small thread-safe pool of MySQL connections.
+    Connections are opened lazily (up to `size`), handed out LIFO so the
+    warmest socket is reused first, and pinged on borrow when they have
+    been idle longer than `health_check_interval` seconds.
+    """
+
+    def __init__(self, db_config: dict, size: int = 5, borrow_timeout: float = 10.0,
+                 health_check_interval: float = 30.0):
+        self._config = dict(db_config)
+        self.size = max(1, int(size))
+        self.borrow_timeout = borrow_timeout
+        self.health_check_interval = health_check_interval
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._lock = threading.Lock()
+        self._open = 0
+        self._in_use = 0
+        self._stats = {
+            "borrows": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "connects": 0,
+            "connect_time_ms": 0.0,
+            "health_checks": 0,
+            "reconnects": 0,
+            "discarded": 0,
+        }
+
+    def _connect(self):
+        started = time.perf_counter()
+        conn = mysql.connector.connect(**self._config)
+        elapsed = time.perf_counter() - started
+        metrics.DB_CONNECT_DURATION.observe(elapsed)
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self._stats["connects"] += 1
+            self._stats["connect_time_ms"] += elapsed_ms
+        return conn
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Borrows a healthy connection, opening or waiting for one if needed."""
+        entry = None
+        create = False
+        try:
+            entry = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._open < self.size:
+                    self._open += 1
+                    create = True
+
+        if create:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                raise
+        else:
+            if entry is None:
+                with self._lock:
+                    self._stats["waits"] += 1
+                wait_started = time.perf_counter()
+                try:
+                    entry = self._idle.get(timeout=self.borrow_timeout)
+                    metrics.DB_POOL_WAIT.observe(time.perf_counter() - wait_started)
+                except queue.Empty:
+                    with self._lock:
+                        self._stats["timeouts"] += 1
+                    raise errors.PoolError(
+                        f"No database connection became free within {self.borrow_timeout}s "
+                        f"(pool size {self.size})."
+                    ) from None
+            conn = self._check_health(*entry)
+
+        with self._lock:
+            self._in_use += 1
+            self._stats["borrows"] += 1
+        return conn
+
+    def _check_health(self, conn, idle_since: float):
+        """Pings a connection that sat idle too long and replaces it if the socket went stale."""
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return conn
+        with self._lock:
+            self._stats["health_checks"] += 1
+        try:
+            conn.ping(reconnect=False)
+            return conn
+        except errors.Error:
+            self._close_quietly(conn)
+            with self._lock:
+                self._stats["reconnects"] += 1
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                raise
+
+    def release(self, conn, discard: bool = False):
+        """Returns a connection to the pool, or closes it when it is broken."""
+        with self._lock:
+            self._in_use -= 1
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except errors.Error:
+                discard = True
+        if discard:
+            self._close_quietly(conn)
+            with self._lock:
+                self._open -= 1
+                self._stats["discarded"] += 1
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager that borrows a connection and always gives it back.
+        The connection it yields times each statement into the query metrics.
+        """
+        conn = self.acquire()
+        discard = False
+        try:
+            yield _TimedConnection(conn)
+        except (errors.OperationalError, errors.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def stats(self) -> dict:
+        """Returns a snapshot of pool usage counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+            })
+        connects = snapshot["connects"]
+        snapshot["avg_connect_ms"] = round(snapshot.pop("connect_time_ms") / connects, 2) if connects else None
+        return snapshot
@@ -1,13 +1,24 @@
 # backend/dentist_bridge_server.py
 import uvicorn
-from fastapi import FastAPI, HTTPException, Request, Depends, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request, Depends, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-import json
+import os
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List
+
+import idempotency_store
+import metrics
+import structured_logging
 from datetime import datetime, timedelta
 
 # --- Import the specific, logical tools from your MCP server ---
@@ -16,23 +27,145 @@ from dentist_mcp_server import (
     verify_patient,
     create_patient,
     check_availability,
+    find_available_slots,
     book_dentist_appointment,
     get_patient_appointments,
+    get_patient_overview,
     cancel_booking,
+    join_waitlist,
+    leave_waitlist,
     
     # Dashboard Functions
     get_dashboard_stats,
     get_chart_data,
     get_todays_bookings_details,
     get_monthly_breakdown_chart_data,
+    get_dashboard_overview,
+    get_schedule_matrix,
+    export_appointments,
+    import_records,
+    get_db_pool_stats,
+    get_cache_stats,
+    get_notification_stats,
+    start_background_workers,
     
     # NEW: Auth Functions
     get_user_by_email,
     create_admin_user,
-    verify_password
+    verify_password,
+    get_cached_principal,
+    load_principal
 )
 
 app = FastAPI()
+log = structured_logging.get_logger("bridge")
+
+# --- Blocking work (mysql.connector, bcrypt) runs on a bounded thread pool, never on the event loop ---
+# Keep this at or below DB_POOL_SIZE so workers don't just queue for connections.
+BRIDGE_WORKERS = int(os.getenv("BRIDGE_WORKERS", os.getenv("DB_POOL_SIZE", "5")))
+_blocking_executor = ThreadPoolExecutor(max_workers=BRIDGE_WORKERS, thread_name_prefix="bridge-worker")
+
+async def run_blocking(func, *args, **kwargs):
+    """Runs a blocking tool/data-layer call on the worker pool and awaits its result."""
+    loop = asyncio.get_running_loop()
+    # Copy the context so log lines from the worker carry this request's id
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(context.run, func, *args, **kwargs))
+
+@app.on_event("startup")
+def start_workers():
+    """Starts the WhatsApp outbox and reminder threads once the server is up."""
+    start_background_workers()
+
+# --- Request ids and access logging ---
+REQUEST_ID_HEADER = "X-Request-ID"
+
+@app.middleware("http")
+async def log_requests(request: Request, call_next):
+    """
+    Binds a request id (the caller's X-Request-ID, or a new one), logs one line
+    per request and records its latency and MySQL round-trip count.
+    """
+    request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex[:16]
+    tokens = structured_logging.bind_request(request_id)
+    round_trips_token = metrics.begin_request()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+        elapsed = time.perf_counter() - started
+        round_trips = metrics.end_request(round_trips_token)
+        round_trips_token = None
+        # Label by route template (/admin/import/{kind}) so ids in paths don't multiply series
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        metrics.HTTP_REQUEST_DURATION.observe(elapsed, route_path, response.status_code)
+        metrics.DB_ROUND_TRIPS.observe(round_trips, route_path)
+        log.info("request", extra={
+            "method": request.method, "path": request.url.path, "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 2), "db_round_trips": round_trips,
+        })
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+    except Exception:
+        log.exception("request failed", extra={"method": request.method, "path": request.url.path})
+        raise
+    finally:
+        if round_trips_token is not None:
+            metrics.end_request(round_trips_token)
+        structured_logging.unbind_request(tokens)
+
+def log_tool_call(tool: str, arguments: dict, result, started: float):
+    """
+    Records the call's latency and status in the tool metrics and writes one INFO
+    line; the arguments and full result are only attached at DEBUG.
+    """
+    elapsed = time.perf_counter() - started
+    result_status = result.get("status") if isinstance(result, dict) else None
+    metrics.TOOL_DURATION.observe(elapsed, tool)
+    metrics.TOOL_CALLS.inc(tool, result_status or "unknown")
+    fields = {"tool": tool, "status": result_status, "duration_ms": round(elapsed * 1000, 2)}
+    if log.isEnabledFor(logging.DEBUG):
+        fields["arguments"] = arguments
+        fields["result"] = result
+    log.info("tool call", extra=fields)
+
+# --- Idempotency keys for /tools/* writes (Vapi retries tool calls that time out) ---
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+idempotent_results = idempotency_store.store_from_env()
+
+async def run_idempotent(request: Request, arguments: dict, func, **kwargs):
+    """
+    Runs a write tool at most once per idempotency key (the Idempotency-Key
+    header, or an "idempotency_key" argument) and replays its stored result
+    for retries. Without a key it is just run_blocking.
+    Store lookups and waits for an in-flight original use the default executor,
+    so they never hold one of the database workers.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER) or arguments.get("idempotency_key")
+    if not key:
+        return await run_blocking(func, **kwargs)
+    scoped_key = f"{request.url.path}:{key}"
+    request_fingerprint = idempotency_store.fingerprint(kwargs)
+    loop = asyncio.get_running_loop()
+    state, result = await loop.run_in_executor(None, idempotent_results.begin, scoped_key, request_fingerprint)
+    if state == idempotency_store.REPLAY:
+        log.info("idempotent replay", extra={"idempotency_key": key, "path": request.url.path})
+        return result
+    if state == idempotency_store.MISMATCH:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} {key} was already used for a different request.")
+    if state == idempotency_store.IN_PROGRESS:
+        raise HTTPException(status_code=409, detail=f"A request with {IDEMPOTENCY_HEADER} {key} is still being processed.")
+    try:
+        result = await run_blocking(func, **kwargs)
+    except BaseException:
+        await loop.run_in_executor(None, idempotent_results.abandon, scoped_key)
+        raise
+    # "Error" results come from infrastructure failures; let a retry run the call again
+    if isinstance(result, dict) and result.get("status") == "Error":
+        await loop.run_in_executor(None, idempotent_results.abandon, scoped_key)
+    else:
+        await loop.run_in_executor(None, idempotent_results.finish, scoped_key, request_fingerprint, result)
+    return result
 
 # --- CORS MIDDLEWARE ---
 app.add_middleware(
@@ -68,6 +201,11 @@ class CheckAvailabilityPayload(BaseModel):
     appointment_date: str
     patient_id: Optional[int] = None
     appointment_start_time: Optional[str] = None
+    # When set, return this many ranked options instead of the single earliest slot
+    count: Optional[int] = None
+    time_preference: Optional[str] = None
+    # e.g. "cleaning" or "root canal"; sets the appointment length (see clinic calendar)
+    appointment_type: Optional[str] = None
 
 class BookDentistAppointmentPayload(BaseModel):
     dentist_id: int
@@ -75,14 +213,29 @@ class BookDentistAppointmentPayload(BaseModel):
     appointment_date: str
     appointment_start_time: str
     reason: Optional[str] = None
+    appointment_type: Optional[str] = None
     
 class GetPatientAppointmentsPayload(BaseModel):
     phone: str
 
+class GetPatientOverviewPayload(BaseModel):
+    phone: str
+
 class CancelBookingPayload(BaseModel):
     phone: str
     appointment_date: str
 
+class JoinWaitlistPayload(BaseModel):
+    patient_id: int
+    earliest_date: str
+    latest_date: Optional[str] = None
+    dentist_id: Optional[int] = None
+    time_preference: Optional[str] = None
+    appointment_type: Optional[str] = None
+
+class LeaveWaitlistPayload(BaseModel):
+    patient_id: int
+
 # --- (Existing Pydantic Models for Dashboard) ---
 class DashboardStats(BaseModel):
     todays_bookings: int
@@ -118,6 +271,12 @@ class MonthlyBreakdownDataPoint(BaseModel):
 
 class MonthlyBreakdownResponse(BaseModel):
     data: List[MonthlyBreakdownDataPoint]
+
+class DashboardOverviewResponse(BaseModel):
+    stats: DashboardStats
+    chart_data: List[ChartDataPoint]
+    todays_bookings: List[TodaysBookingItem]
+    monthly_breakdown: List[MonthlyBreakdownDataPoint]
     
 # --- NEW: Pydantic Models for Auth ---
 class Token(BaseModel):
@@ -150,6 +309,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# In-flight principal loads, so parallel dashboard requests share one DB lookup
+_principal_loads = {}
+
+async def _load_principal_once(email: str):
+    task = _principal_loads.get(email)
+    if task is None:
+        task = asyncio.ensure_future(run_blocking(load_principal, email))
+        _principal_loads[email] = task
+        task.add_done_callback(lambda _: _principal_loads.pop(email, None))
+    return await asyncio.shield(task)
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     """
     FastAPI Dependency to get the current user from a token.
@@ -169,7 +339,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     except JWTError:
         raise credentials_exception
         
-    user = get_user_by_email(email=token_data.email)
+    # Common case: the user was validated recently and is served from memory
+    user = get_cached_principal(token_data.email)
+    if user is None:
+        user = await _load_principal_once(token_data.email)
     if user is None:
         raise credentials_exception
         
@@ -181,117 +354,184 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
 # These endpoints are for Vapi and should remain public (no auth).
 @app.post("/tools/verify-patient")
 async def handle_verify_patient(request: Request):
-    # ... (function contents are unchanged) ...
+    started = time.perf_counter()
     try:
         arguments = await request.json()
-        print("\n--- [verify_patient] ---")
-        print(f"✅ 1. RAW VAPI PAYLOAD RECEIVED:\n{json.dumps(arguments, indent=2)}")
         payload = VerifyPatientPayload(**arguments)
-        result = verify_patient(phone=payload.phone)
-        print(f"✅ 2. FINAL RESULT SENT TO VAPI:\n{result}\n--------------------------\n")
+        result = await run_blocking(verify_patient, phone=payload.phone)
+        log_tool_call("verify_patient", arguments, result, started)
         return JSONResponse(content=result, status_code=200)
     except Exception as e:
         error_detail = f"Error processing verify_patient: {str(e)}"
-        print(f"❌ {error_detail}")
+        log.exception(error_detail, extra={"tool": "verify_patient"})
         raise HTTPException(status_code=500, detail=error_detail)
 
 @app.post("/tools/create-patient")
 async def handle_create_patient(request: Request):
-    # ... (function contents are unchanged) ...
+    started = time.perf_counter()
     try:
         arguments = await request.json()
-        print("\n--- [create_patient] ---")
-        print(f"✅ 1. RAW VAPI PAYLOAD RECEIVED:\n{json.dumps(arguments, indent=2)}")
         payload = CreatePatientPayload(**arguments)
-        result = create_patient(
+        result = await run_idempotent(
+            request, arguments, create_patient,
             full_name=payload.full_name,
             date_of_birth=payload.date_of_birth,
             phone=payload.phone,
             gender=payload.gender,
             address=payload.address
         )
-        print(f"✅ 2. FINAL RESULT SENT TO VAPI:\n{result}\n--------------------------\n")
+        log_tool_call("create_patient", arguments, result, started)
         return JSONResponse(content=result, status_code=200)
+    except HTTPException:
+        raise
     except Exception as e:
         error_detail = f"Error processing create_patient: {str(e)}"
-        print(f"❌ {error_detail}")
+        log.exception(error_detail, extra={"tool": "create_patient"})
         raise HTTPException(status_code=500, detail=error_detail)
 
 @app.post("/tools/check-availability")
 async def handle_check_availability(request: Request):
-    # ... (function contents are unchanged) ...
+    started = time.perf_counter()
+    tool = "check_availability"
     try:
         arguments = await request.json()
-        print("\n--- [check_availability] ---")
-        print(f"✅ 1. RAW VAPI PAYLOAD RECEIVED:\n{json.dumps(arguments, indent=2)}")
         payload = CheckAvailabilityPayload(**arguments)
-        result = check_availability(
-            appointment_date=payload.appointment_date,
-            patient_id=payload.patient_id,
-            appointment_start_time=payload.appointment_start_time
-        )
-        print(f"✅ 2. FINAL RESULT SENT TO VAPI:\n{result}\n-----------------------------\n")
+        if payload.count:
+            # Ranked mode runs a different tool; attribute logs and metrics to it
+            tool = "find_available_slots"
+            result = await run_blocking(
+                find_available_slots,
+                appointment_date=payload.appointment_date,
+                patient_id=payload.patient_id,
+                count=payload.count,
+                time_preference=payload.time_preference,
+                appointment_type=payload.appointment_type
+            )
+        else:
+            result = await run_blocking(
+                check_availability,
+                appointment_date=payload.appointment_date,
+                patient_id=payload.patient_id,
+                appointment_start_time=payload.appointment_start_time,
+                appointment_type=payload.appointment_type
+            )
+        log_tool_call(tool, arguments, result, started)
         return JSONResponse(content=result, status_code=200)
     except Exception as e:
-        error_detail = f"Error processing check_availability: {str(e)}"
-        print(f"❌ {error_detail}")
+        error_detail = f"Error processing {tool}: {str(e)}"
+        log.exception(error_detail, extra={"tool": tool})
         raise HTTPException(status_code=500, detail=error_detail)
 
 @app.post("/tools/book-dentist-appointment")
 async def handle_book_dentist_appointment(request: Request):
-    # ... (function contents are unchanged) ...
+    started = time.perf_counter()
     try:
         arguments = await request.json()
-        print("\n--- [book_dentist_appointment] ---")
-        print(f"✅ 1. RAW VAPI PAYLOAD RECEIVED:\n{json.dumps(arguments, indent=2)}")
         payload = BookDentistAppointmentPayload(**arguments)
-        result = book_dentist_appointment(
+        result = await run_idempotent(
+            request, arguments, book_dentist_appointment,
             dentist_id=payload.dentist_id,
             patient_id=payload.patient_id,
             appointment_date=payload.appointment_date,
             appointment_start_time=payload.appointment_start_time,
-            reason=payload.reason
+            reason=payload.reason,
+            appointment_type=payload.appointment_type
         )
-        print(f"✅ 2. FINAL RESULT SENT TO VAPI:\n{result}\n-----------------------------------\n")
+        log_tool_call("book_dentist_appointment", arguments, result, started)
         return JSONResponse(content=result, status_code=200)
+    except HTTPException:
+        raise
     except Exception as e:
         error_detail = f"Error processing book_dentist_appointment: {str(e)}"
-        print(f"❌ {error_detail}")
+        log.exception(error_detail, extra={"tool": "book_dentist_appointment"})
         raise HTTPException(status_code=500, detail=error_detail)
     
 @app.post("/tools/get-patient-appointments")
 async def handle_get_patient_appointments(request: Request):
-    # ... (function contents are unchanged) ...
+    started = time.perf_counter()
     try:
         arguments = await request.json()
-        print("\n--- [get_patient_appointments] ---")
-        print(f"✅ 1. RAW VAPI PAYLOAD RECEIVED:\n{json.dumps(arguments, indent=2)}")
         payload = GetPatientAppointmentsPayload(**arguments)
-        result = get_patient_appointments(phone=payload.phone)
-        print(f"✅ 2. FINAL RESULT SENT TO VAPI:\n{result}\n-----------------------------------\n")
+        result = await run_blocking(get_patient_appointments, phone=payload.phone)
+        log_tool_call("get_patient_appointments", arguments, result, started)
         return JSONResponse(content=result, status_code=200)
     except Exception as e:
         error_detail = f"Error processing get_patient_appointments: {str(e)}"
-        print(f"❌ {error_detail}")
+        log.exception(error_detail, extra={"tool": "get_patient_appointments"})
+        raise HTTPException(status_code=500, detail=error_detail)
+
+@app.post("/tools/get-patient-overview")
+async def handle_get_patient_overview(request: Request):
+    started = time.perf_counter()
+    try:
+        arguments = await request.json()
+        payload = GetPatientOverviewPayload(**arguments)
+        result = await run_blocking(get_patient_overview, phone=payload.phone)
+        log_tool_call("get_patient_overview", arguments, result, started)
+        return JSONResponse(content=result, status_code=200)
+    except Exception as e:
+        error_detail = f"Error processing get_patient_overview: {str(e)}"
+        log.exception(error_detail, extra={"tool": "get_patient_overview"})
         raise HTTPException(status_code=500, detail=error_detail)
 
 @app.post("/tools/cancel-booking")
 async def handle_cancel_booking(request: Request):
-    # ... (function contents are unchanged) ...
+    started = time.perf_counter()
     try:
         arguments = await request.json()
-        print("\n--- [cancel_booking] ---")
-        print(f"✅ 1. RAW VAPI PAYLOAD RECEIVED:\n{json.dumps(arguments, indent=2)}")
         payload = CancelBookingPayload(**arguments)
-        result = cancel_booking(
+        result = await run_idempotent(
+            request, arguments, cancel_booking,
             phone=payload.phone,
             appointment_date=payload.appointment_date
         )
-        print(f"✅ 2. FINAL RESULT SENT TO VAPI:\n{result}\n---------------------------\n")
+        log_tool_call("cancel_booking", arguments, result, started)
         return JSONResponse(content=result, status_code=200)
+    except HTTPException:
+        raise
     except Exception as e:
         error_detail = f"Error processing cancel_booking: {str(e)}"
-        print(f"❌ {error_detail}")
+        log.exception(error_detail, extra={"tool": "cancel_booking"})
+        raise HTTPException(status_code=500, detail=error_detail)
+
+@app.post("/tools/join-waitlist")
+async def handle_join_waitlist(request: Request):
+    started = time.perf_counter()
+    try:
+        arguments = await request.json()
+        payload = JoinWaitlistPayload(**arguments)
+        result = await run_idempotent(
+            request, arguments, join_waitlist,
+            patient_id=payload.patient_id,
+            earliest_date=payload.earliest_date,
+            latest_date=payload.latest_date,
+            dentist_id=payload.dentist_id,
+            time_preference=payload.time_preference,
+            appointment_type=payload.appointment_type
+        )
+        log_tool_call("join_waitlist", arguments, result, started)
+        return JSONResponse(content=result, status_code=200)
+    except HTTPException:
+        raise
+    except Exception as e:
+        error_detail = f"Error processing join_waitlist: {str(e)}"
+        log.exception(error_detail, extra={"tool": "join_waitlist"})
+        raise HTTPException(status_code=500, detail=error_detail)
+
+@app.post("/tools/leave-waitlist")
+async def handle_leave_waitlist(request: Request):
+    started = time.perf_counter()
+    try:
+        arguments = await request.json()
+        payload = LeaveWaitlistPayload(**arguments)
+        result = await run_idempotent(request, arguments, leave_waitlist, patient_id=payload.patient_id)
+        log_tool_call("leave_waitlist", arguments, result, started)
+        return JSONResponse(content=result, status_code=200)
+    except HTTPException:
+        raise
+    except Exception as e:
+        error_detail = f"Error processing leave_waitlist: {str(e)}"
+        log.exception(error_detail, extra={"tool": "leave_waitlist"})
         raise HTTPException(status_code=500, detail=error_detail)
 
 
@@ -304,10 +544,10 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     Returns a JWT access token.
     """
     # 1. Find the user in the database
-    user = get_user_by_email(form_data.username) # form_data.username is the email
+    user = await run_blocking(get_user_by_email, form_data.username) # form_data.username is the email
     
     # 2. Check if user exists and password is correct
-    if not user or not verify_password(form_data.password, user['password_hash']):
+    if not user or not await run_blocking(verify_password, form_data.password, user['password_hash']):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -327,14 +567,14 @@ async def create_new_user(user: UserCreate):
     Utility endpoint to create the first admin user.
     You can remove this after setting up your first user.
     """
-    existing_user = get_user_by_email(user.email)
+    existing_user = await run_blocking(get_user_by_email, user.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
         
-    result = create_admin_user(email=user.email, plain_password=user.password)
+    result = await run_blocking(create_admin_user, email=user.email, plain_password=user.password)
     
     if result.get("status") != "Success":
         raise HTTPException(
@@ -347,18 +587,100 @@ async def create_new_user(user: UserCreate):
 
 # --- UPDATED: Protected Dashboard API Endpoints ---
 
+@app.get("/admin/dashboard", response_model=DashboardOverviewResponse)
+async def get_dashboard_overview_endpoint(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Endpoint returning every dashboard payload (stats, daily chart, today's
+    bookings, monthly breakdown) in one round trip.
+    This is PROTECTED.
+    """
+    try:
+        return await run_blocking(get_dashboard_overview)
+    except Exception as e:
+        log.exception("/admin/dashboard failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/admin/schedule")
+async def get_schedule_endpoint(
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """
+    Endpoint returning the free/booked/closed grid for every dentist, day and
+    slot in [from, to] (YYYY-MM-DD, default: the next 7 days), streamed as
+    compact JSON with one string per dentist-day.
+    This is PROTECTED.
+    """
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d").date() if from_date else datetime.now().date()
+        end = datetime.strptime(to_date, "%Y-%m-%d").date() if to_date else start + timedelta(days=6)
+        matrix = await run_blocking(get_schedule_matrix, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.exception("/admin/schedule failed")
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(matrix.iter_json(), media_type="application/json")
+
+@app.get("/admin/export/appointments")
+async def export_appointments_endpoint(
+    format: str = "csv",
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    dentist_id: Optional[int] = None,
+    status: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """
+    Endpoint streaming every matching appointment as CSV or NDJSON
+    (?format=csv|ndjson&from=&to=&dentist_id=&status=).
+    This is PROTECTED.
+    """
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d").date() if from_date else None
+        end = datetime.strptime(to_date, "%Y-%m-%d").date() if to_date else None
+        chunks, media_type = await run_blocking(
+            export_appointments, format.lower(), start, end, dentist_id, status
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.exception("/admin/export/appointments failed")
+        raise HTTPException(status_code=500, detail=str(e))
+    filename = f"appointments.{format.lower()}"
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.post("/admin/import/{kind}")
+async def import_records_endpoint(kind: str, request: Request, format: str = "csv",
+                                  current_user: UserInDB = Depends(get_current_user)):
+    """
+    Endpoint importing patients or appointments from a CSV/NDJSON request body
+    (?format=csv|ndjson). Returns counts and per-row errors.
+    This is PROTECTED.
+    """
+    try:
+        text = (await request.body()).decode("utf-8-sig")
+        return await run_blocking(import_records, kind, text, format.lower())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.exception("/admin/import failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/admin/stats", response_model=DashboardStats)
 async def get_dashboard_stats_endpoint(current_user: UserInDB = Depends(get_current_user)):
     """
     Endpoint for the admin dashboard to fetch KPI stats.
     This is now PROTECTED.
     """
-    print(f"Authenticated access for: {current_user.user_email}")
+    log.debug("authenticated access", extra={"user": current_user.user_email})
     try:
-        stats = get_dashboard_stats() 
+        stats = await run_blocking(get_dashboard_stats) 
         return stats
     except Exception as e:
-        print(f"❌ Error in /admin/stats endpoint: {e}")
+        log.exception("/admin/stats failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/admin/chart-data", response_model=BookingsChartResponse)
@@ -368,10 +690,10 @@ async def get_bookings_chart_data_endpoint(current_user: UserInDB = Depends(get_
     This is now PROTECTED.
     """
     try:
-        chart_data = get_chart_data()
+        chart_data = await run_blocking(get_chart_data)
         return chart_data
     except Exception as e:
-        print(f"❌ Error in /admin/chart-data endpoint: {e}")
+        log.exception("/admin/chart-data failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/admin/todays-bookings", response_model=TodaysBookingsResponse)
@@ -381,10 +703,10 @@ async def get_todays_bookings_endpoint(current_user: UserInDB = Depends(get_curr
     This is now PROTECTED.
     """
     try:
-        bookings_data = get_todays_bookings_details()
+        bookings_data = await run_blocking(get_todays_bookings_details)
         return bookings_data
     except Exception as e:
-        print(f"❌ Error in /admin/todays-bookings endpoint: {e}")
+        log.exception("/admin/todays-bookings failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/admin/monthly-breakdown", response_model=MonthlyBreakdownResponse)
@@ -394,12 +716,46 @@ async def get_monthly_breakdown_endpoint(current_user: UserInDB = Depends(get_cu
     This is now PROTECTED.
     """
     try:
-        chart_data = get_monthly_breakdown_chart_data()
+        chart_data = await run_blocking(get_monthly_breakdown_chart_data)
         return chart_data
     except Exception as e:
-        print(f"❌ Error in /admin/monthly-breakdown endpoint: {e}")
+        log.exception("/admin/monthly-breakdown failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/admin/db-pool")
+async def get_db_pool_endpoint(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Endpoint exposing database connection pool usage metrics.
+    This is PROTECTED.
+    """
+    return get_db_pool_stats()
+
+@app.get("/admin/cache-stats")
+async def get_cache_stats_endpoint(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Endpoint exposing hit/miss counters for the in-process caches and the
+    idempotency-key store.
+    This is PROTECTED.
+    """
+    return {**get_cache_stats(), "idempotency": idempotent_results.stats()}
+
+@app.get("/admin/notifications")
+async def get_notification_stats_endpoint(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Endpoint exposing WhatsApp outbox delivery counts and reminder scheduler state.
+    This is PROTECTED.
+    """
+    return await run_blocking(get_notification_stats)
+
+
+@app.get("/metrics")
+def get_metrics_endpoint():
+    """
+    Prometheus text-format metrics: per-tool and per-query latency histograms,
+    MySQL round trips per request, connection open/wait times and WhatsApp outcomes.
+    """
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 
 # --- Root endpoint for health check ---
 @app.get("/")
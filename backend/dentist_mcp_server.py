@@ -1,15 +1,32 @@
 # backend/dentist_mcp_server.py
+import io
 import sys
 import mysql.connector
-import requests
-import json
 from datetime import datetime, timedelta, date
 import calendar
 from passlib.context import CryptContext  # <-- NEW: For password hashing
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 import os
+import threading
+from db_pool import MISSING_TABLE_ERRNO, UNKNOWN_COLUMN_ERRNO, ConnectionPool
+from availability import (
+    AvailabilityWindow, OccupancyMatrix, build_booked_masks, format_minutes, parse_preference, to_minutes,
+)
+from clinic_calendar import load_calendar
+from slot_holds import SlotHolds
+from notification_outbox import outbox_from_env
+from reminder_scheduler import ReminderScheduler
+from booking_rollups import apply_rollup_delta, load_daily_status_counts
+from ttl_cache import TTLCache
+from export_formats import EXPORT_FORMATS
+from bulk_import import run_import
+import waitlist
+from phone_numbers import normalize_phone
+from structured_logging import get_logger
+import metrics
 mcp = FastMCP("Dentist-Appointment-MCP")
+log = get_logger("mcp")
 
 
 load_dotenv()  # Load variables from .env
@@ -20,6 +37,42 @@ DB_CONFIG = {
     'password': os.getenv("DB_PASSWORD"),
     'database': os.getenv("DB_NAME")
 }
+
+# --- Shared connection pool (used by every tool and dashboard function) ---
+db_pool = ConnectionPool(
+    DB_CONFIG,
+    size=int(os.getenv("DB_POOL_SIZE", "5")),
+    borrow_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    health_check_interval=float(os.getenv("DB_POOL_HEALTH_CHECK_SECONDS", "30")),
+)
+
+# Errors that mean the pooled socket died underneath us (server gone away / lost connection)
+_STALE_CONNECTION_ERRNOS = {2006, 2013, 2055}
+
+# --- WhatsApp outbox (durable, delivered in the background) ---
+whatsapp_outbox = outbox_from_env()
+
+# --- Appointment reminders (queued into the outbox N hours ahead) ---
+appointment_reminders = ReminderScheduler(
+    db_pool,
+    whatsapp_outbox,
+    lead_hours=float(os.getenv("REMINDER_LEAD_HOURS", "24")),
+    interval=float(os.getenv("REMINDER_INTERVAL_SECONDS", "60")),
+    batch_size=int(os.getenv("REMINDER_BATCH_SIZE", "200")),
+)
+
+
+def start_background_workers():
+    """
+    Starts the outbox worker (draining anything left over from a previous run)
+    and, unless REMINDERS_ENABLED is off, the reminder scheduler. Called by the
+    MCP entry point and the bridge's startup hook, not at import, so CLIs that
+    import this module don't spawn threads.
+    """
+    whatsapp_outbox.start()
+    if os.getenv("REMINDERS_ENABLED", "true").lower() in ("1", "true", "yes"):
+        appointment_reminders.start()
+
 # --- NEW: Password Hashing Setup ---
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -40,16 +93,24 @@ def get_password_hash(password):
 
 def _run_query(query: str, params: tuple = None, fetch: str = 'all'):
     """
-    Executes a database query using a new connection and a buffered cursor.
+    Executes a database query on a pooled connection using a buffered cursor.
     Handles SELECT, INSERT, and UPDATE operations correctly.
+    Read queries are retried once on a fresh connection if the pooled one went stale.
     """
-    conn = None
+    clean_query = query.strip().upper()
+    attempts = 2 if clean_query.startswith("SELECT") else 1
+    for attempt in range(attempts):
+        try:
+            with db_pool.connection() as conn:
+                return _execute(conn, query, params, fetch, clean_query)
+        except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError) as err:
+            if attempt + 1 < attempts and err.errno in _STALE_CONNECTION_ERRNOS:
+                continue
+            raise
+
+def _execute(conn, query: str, params: tuple, fetch: str, clean_query: str):
+    cursor = conn.cursor(dictionary=True, buffered=True)
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor(dictionary=True, buffered=True)
-        
-        # Normalize the query to check its type
-        clean_query = query.strip().upper()
         cursor.execute(query, params or ())
         
         if cursor.description: # This is a SELECT query
@@ -66,18 +127,48 @@ def _run_query(query: str, params: tuple = None, fetch: str = 'all'):
             # Fallback for other non-SELECT queries
             return {"status": "Success"}
     finally:
-        if conn and conn.is_connected():
-            conn.close()
+        cursor.close()
+
+def get_db_pool_stats():
+    """Returns usage metrics for the shared database connection pool."""
+    return db_pool.stats()
 
 # --- NEW: User Management Functions (NOT @mcp.tool) ---
+USER_BY_EMAIL_QUERY = "SELECT * FROM users WHERE user_email = %s"
+
 def get_user_by_email(email: str):
     """Fetches a user from the 'users' table by their email."""
     try:
-        query = "SELECT * FROM users WHERE user_email = %s"
-        return _run_query(query, (email,), fetch='one')
-    except Exception as e:
-        print(f"  - ❌ Error in get_user_by_email: {e}")
+        return _run_query(USER_BY_EMAIL_QUERY, (email,), fetch='one')
+    except Exception:
+        log.exception("get_user_by_email failed")
+        return None
+
+# --- Principal cache: validated users (minus password hash) keyed by email / JWT subject ---
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300")),
+)
+
+def get_cached_principal(email: str):
+    """Returns the cached user for a token subject, or None on a miss (no DB access)."""
+    return principal_cache.get(email)
+
+def load_principal(email: str):
+    """Fetches a user without the password hash and caches it for later token checks."""
+    user = get_user_by_email(email)
+    if user is None:
         return None
+    principal = {k: v for k, v in user.items() if k != 'password_hash'}
+    principal_cache.set(email, principal)
+    return principal
+
+def invalidate_principal(email: str = None):
+    """Drops a cached user (or all of them) after the users table changes."""
+    if email is None:
+        principal_cache.clear()
+    else:
+        principal_cache.invalidate(email)
 
 def create_admin_user(email: str, plain_password: str):
     """Creates a new admin user with a hashed password."""
@@ -89,6 +180,7 @@ def create_admin_user(email: str, plain_password: str):
         params = (email, email, hashed_password)
         
         result = _run_query(query, params)
+        invalidate_principal(email)
         
         if result and result.get('status') == "Success":
             return {"status": "Success", "user_id": result.get('last_id')}
@@ -100,40 +192,140 @@ def create_admin_user(email: str, plain_password: str):
              return {"status": "Error", "message": "Email or username already exists."}
         return {"status": "Error", "message": str(err)}
     except Exception as e:
-        print(f"  - ❌ Error in create_admin_user: {e}")
+        log.exception("create_admin_user failed")
         return {"status": "Error", "message": str(e)}
 
 def _send_whatsapp_confirmation(recipient_phone: str, message_body: str):
-    # ... (function contents are unchanged) ...
-    bridge_url = "http://localhost:8080/api/send"
-    headers = {"Content-Type": "application/json"}
-    formatted_phone = str(recipient_phone).strip()
-    if not formatted_phone.startswith("91"):
-        formatted_phone = "91" + formatted_phone
-    payload = {
-        "recipient": formatted_phone, 
-        "message": message_body
+    """Queues a WhatsApp message in the outbox; delivery happens on a background thread."""
+    formatted_phone = normalize_phone(recipient_phone)
+    try:
+        outbox_id = whatsapp_outbox.enqueue(formatted_phone, message_body)
+        log.debug("whatsapp message queued", extra={"outbox_id": outbox_id})
+    except Exception:
+        log.exception("failed to queue whatsapp message")
+
+def get_notification_stats():
+    """Returns WhatsApp outbox counts per delivery status plus reminder scheduler counters."""
+    return {**whatsapp_outbox.stats(), "reminders": appointment_reminders.stats()}
+
+
+# Identity, upcoming Scheduled appointments and last-visited dentist in one round trip.
+# One row per upcoming appointment (or a single row with NULL appointment columns).
+_PATIENT_OVERVIEW_SQL = """
+    SELECT p.patient_id, p.full_name,
+           a.appointment_id, a.dentist_id, d.name AS dentist_name,
+           a.appointment_date, a.appointment_start_time,
+           lv.dentist_id AS last_dentist_id, lv.name AS last_dentist_name
+    FROM patients p
+    LEFT JOIN appointments a
+           ON a.patient_id = p.patient_id AND a.status = 'Scheduled' AND a.appointment_date >= CURDATE()
+    LEFT JOIN dentists d ON d.dentist_id = a.dentist_id
+    LEFT JOIN dentists lv ON lv.dentist_id = (
+        SELECT la.dentist_id FROM appointments la
+        WHERE la.patient_id = p.patient_id
+        ORDER BY la.appointment_date DESC LIMIT 1
+    )
+    WHERE p.{phone_column} = %s
+    ORDER BY p.patient_id, a.appointment_date, a.appointment_start_time
+"""
+PATIENT_OVERVIEW_QUERY = _PATIENT_OVERVIEW_SQL.format(phone_column="phone_normalized")
+# Used until `python schema_migrations.py migrate` has added phone_normalized
+PATIENT_OVERVIEW_RAW_PHONE_QUERY = _PATIENT_OVERVIEW_SQL.format(phone_column="phone")
+
+# --- Patient cache: normalized phone -> {patient_id, full_name} ---
+# Filled by lookups and by create_patient, so repeat callers skip the database.
+patient_cache = TTLCache(
+    maxsize=int(os.getenv("PATIENT_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PATIENT_CACHE_TTL_SECONDS", "3600")),
+)
+# patient_id -> get_patient_overview result. Short-lived: it lets the tool calls
+# of one voice conversation share a single query; bookings and cancellations drop it.
+patient_overview_cache = TTLCache(
+    maxsize=int(os.getenv("PATIENT_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PATIENT_OVERVIEW_CACHE_TTL_SECONDS", "30")),
+)
+
+def _build_patient_overview(rows) -> dict:
+    first = rows[0]
+    # Rows for any later (duplicate) patient with the same number are ignored
+    rows = [row for row in rows if row['patient_id'] == first['patient_id']]
+    return {
+        "status": "Success",
+        "patient_id": first['patient_id'],
+        "full_name": first['full_name'],
+        "appointments": [
+            {
+                "appointment_id": row['appointment_id'],
+                "date": str(row['appointment_date']),
+                "time": str(row['appointment_start_time']),
+                "dentist_id": row['dentist_id'],
+                "dentist_name": row['dentist_name'],
+            } for row in rows if row['appointment_id'] is not None
+        ],
+        "last_dentist": (
+            {"dentist_id": first['last_dentist_id'], "name": first['last_dentist_name']}
+            if first['last_dentist_id'] is not None else None
+        ),
     }
-    print(f"\n--- [WhatsApp Notification] ---")
-    print(f"  - Handing off to bridge for: {formatted_phone}")
+
+def _load_patient_overview(phone: str):
+    """Returns the overview dict for a phone number, or None if no patient has it."""
+    normalized = normalize_phone(phone)
+    if normalized is None:
+        return None
+    patient = patient_cache.get(normalized)
+    if patient is not None:
+        overview = patient_overview_cache.get(patient['patient_id'])
+        if overview is not None:
+            return overview
     try:
-        requests.post(bridge_url, headers=headers, data=json.dumps(payload), timeout=3)
-        print("  - ✅ Hand-off to bridge was successful.")
-    except requests.exceptions.Timeout:
-        print("  - ✅ Hand-off successful (Go app is processing).")
-    except requests.exceptions.RequestException as e:
-        print(f"  - ❌ FAILED to send WhatsApp message. Could not connect to the bridge: {e}")
-    except Exception as e:
-        print(f"  - ❌ An unexpected error occurred: {e}")
+        rows = _run_query(PATIENT_OVERVIEW_QUERY, (normalized,))
+    except mysql.connector.errors.ProgrammingError as err:
+        if err.errno != UNKNOWN_COLUMN_ERRNO:
+            raise
+        rows = _run_query(PATIENT_OVERVIEW_RAW_PHONE_QUERY, (phone,))
+    if not rows:
+        return None
+    overview = _build_patient_overview(rows)
+    patient_cache.set(normalized, {"patient_id": overview['patient_id'], "full_name": overview['full_name']})
+    patient_overview_cache.set(overview['patient_id'], overview)
+    return overview
+
+def find_patient_by_phone(phone: str):
+    """Returns {"patient_id", "full_name"} for a phone number in any format, or None."""
+    normalized = normalize_phone(phone)
+    if normalized is None:
+        return None
+    patient = patient_cache.get(normalized)
+    if patient is not None:
+        return patient
+    overview = _load_patient_overview(phone)
+    if overview is None:
+        return None
+    return {"patient_id": overview['patient_id'], "full_name": overview['full_name']}
 
+def _invalidate_patient_overview(patient_id: int):
+    patient_overview_cache.invalidate(patient_id)
+
+@mcp.tool()
+def get_patient_overview(phone: str) -> dict:
+    """
+    Looks a caller up by phone and returns who they are, their upcoming
+    appointments and the dentist they saw last, from a single query.
+    """
+    try:
+        overview = _load_patient_overview(phone)
+        if overview is None:
+            return {"status": "Failed", "message": "No patient found with this phone number."}
+        return overview
+    except Exception as e:
+        log.exception("get_patient_overview failed", extra={"tool": "get_patient_overview"})
+        return {"status": "Error", "message": str(e)}
 
 @mcp.tool()
 def verify_patient(phone:str) -> dict:
-    # ... (function contents are unchanged) ...
     try:
-        query = "SELECT patient_id, full_name FROM patients WHERE phone = %s"
-        params = (phone,)
-        result = _run_query(query, params, fetch='one')
+        result = find_patient_by_phone(phone)
         if result:
             return {"status": "Success", "patient_id": result['patient_id'], "full_name": result['full_name']}
         else:
@@ -143,11 +335,15 @@ def verify_patient(phone:str) -> dict:
 
 @mcp.tool()
 def create_patient(full_name: str, date_of_birth: str, phone: str, gender: str = None, address: str = None) -> dict:
-    # ... (function contents are unchanged) ...
     try:
-        columns = ["full_name", "date_of_birth", "phone"]
-        values_placeholder = ["%s", "%s", "%s"]
-        params = [full_name, date_of_birth, phone]
+        normalized = normalize_phone(phone)
+        # The same number typed differently is the same patient
+        existing = find_patient_by_phone(phone)
+        if existing:
+            return {"status": "Success", "patient_id": existing['patient_id'], "full_name": existing['full_name']}
+        columns = ["full_name", "date_of_birth", "phone", "phone_normalized"]
+        values_placeholder = ["%s", "%s", "%s", "%s"]
+        params = [full_name, date_of_birth, phone, normalized]
         if gender:
             columns.append("gender")
             values_placeholder.append("%s")
@@ -157,86 +353,321 @@ def create_patient(full_name: str, date_of_birth: str, phone: str, gender: str =
             values_placeholder.append("%s")
             params.append(address)
         query = f"INSERT INTO patients ({', '.join(columns)}) VALUES ({', '.join(values_placeholder)})"
-        result = _run_query(query, tuple(params))
+        try:
+            result = _run_query(query, tuple(params))
+        except mysql.connector.errors.ProgrammingError as err:
+            if err.errno != UNKNOWN_COLUMN_ERRNO:
+                raise
+            del columns[3], values_placeholder[3], params[3]
+            query = f"INSERT INTO patients ({', '.join(columns)}) VALUES ({', '.join(values_placeholder)})"
+            result = _run_query(query, tuple(params))
         new_patient_id = result.get('last_id')
         if new_patient_id:
+            if normalized:
+                patient_cache.set(normalized, {"patient_id": new_patient_id, "full_name": full_name})
             return {"status": "Success", "patient_id": new_patient_id, "full_name": full_name}
         else:
             return {"status": "Failed", "message": "Failed to create a new patient record."}
     except Exception as e:
         return {"status": "Error", "message": str(e)}
 
-# ... (check_availability and _get_available_time_slots are unchanged) ...
-def _get_available_time_slots():
-    slots = []
-    for hour in range(10, 13): slots.extend([f"{hour:02}:00:00", f"{hour:02}:30:00"])
-    for hour in range(14, 17): slots.extend([f"{hour:02}:00:00", f"{hour:02}:30:00"])
-    return slots
+# --- Clinic calendar: working hours, breaks and holidays compiled into slot templates ---
+# A relative CLINIC_CALENDAR_PATH is taken from this directory; setting it to a missing file is an error
+CLINIC_CALENDAR = load_calendar(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.getenv("CLINIC_CALENDAR_PATH", "clinic_calendar.json")),
+    required="CLINIC_CALENDAR_PATH" in os.environ,
+)
+SLOT_GRID = CLINIC_CALENDAR.grid
+AVAILABILITY_WINDOW_DAYS = 14
+
+# --- Availability cache: (date, dentist_id) -> booked-slot bitmap ---
+# Only book_dentist_appointment and cancel_booking write appointments, and both
+# invalidate the keys they touch, so the TTL is just a guard against outside edits.
+availability_cache = TTLCache(
+    maxsize=int(os.getenv("AVAILABILITY_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("AVAILABILITY_CACHE_TTL_SECONDS", "60")),
+)
+dentist_cache = TTLCache(maxsize=1, ttl=float(os.getenv("DENTIST_CACHE_TTL_SECONDS", "300")))
+
+# --- Slot holds: a slot offered to one caller is skipped by other searches for a short while ---
+slot_holds = SlotHolds(ttl=float(os.getenv("SLOT_HOLD_SECONDS", "120")))
+
+def _hold_offers(patient_id, offers, duration: int):
+    """
+    Holds the (date, time, dentist_id) slots just offered to a patient, replacing
+    whatever they were offered before. An anonymous hold would block every
+    caller, so nothing is held without a patient_id.
+    """
+    if patient_id is None:
+        return
+    slot_holds.release_holder(patient_id)
+    for slot_date, slot_time, dentist_id in offers:
+        slot_holds.hold(slot_date, dentist_id, to_minutes(slot_time), holder=patient_id, length=duration)
+
+def _parse_requested_date(appointment_date: str) -> date:
+    if appointment_date.lower() == "today": return date.today()
+    if appointment_date.lower() == "tomorrow": return date.today() + timedelta(days=1)
+    return datetime.strptime(appointment_date, "%Y-%m-%d").date()
+
+BOOKED_SLOTS_QUERY = """
+    SELECT dentist_id, appointment_date, appointment_start_time, appointment_end_time
+    FROM appointments
+    WHERE appointment_date BETWEEN %s AND %s AND status = 'Scheduled'
+"""
+
+def _load_availability_window(start_date: date, dentist_ids, holder=None, duration: int = None,
+                              days: int = AVAILABILITY_WINDOW_DAYS) -> AvailabilityWindow:
+    """
+    Builds the search window for appointments of `duration` minutes from cached
+    occupancy bitmaps. Days with any uncached dentist are refreshed with a single
+    range query. Slots held for anyone other than `holder` are treated as booked.
+    """
+    end_date = start_date + timedelta(days=days)
+    window = AvailabilityWindow(CLINIC_CALENDAR, start_date, end_date, duration=duration)
+    missing_days = []
+    for day in window.days():
+        for dentist_id in dentist_ids:
+            mask = availability_cache.get((day, dentist_id))
+            if mask is None:
+                missing_days.append(day)
+                break
+            window.booked[(day, dentist_id)] = mask
+    if missing_days:
+        bookings = _run_query(BOOKED_SLOTS_QUERY, (missing_days[0], missing_days[-1]))
+        fresh = build_booked_masks(SLOT_GRID, bookings or [])
+        for day in missing_days:
+            for dentist_id in dentist_ids:
+                mask = fresh.get((day, dentist_id), 0)
+                availability_cache.set((day, dentist_id), mask)
+                window.booked[(day, dentist_id)] = mask
+    for day in window.days():
+        for dentist_id in dentist_ids:
+            spans = slot_holds.held_spans(day, dentist_id, exclude_holder=holder)
+            window.block(day, dentist_id, [(start, end) for start, end, _ in spans])
+    return window
+
+def _invalidate_availability(appointment_date, dentist_id: int = None):
+    """Drops cached bitmaps for a date (optionally for a single dentist) after a write."""
+    try:
+        day = _parse_requested_date(str(appointment_date))
+    except ValueError:
+        # MySQL accepted a date format we can't parse; play safe and drop everything
+        availability_cache.clear()
+        return
+    if dentist_id is None:
+        availability_cache.invalidate_if(lambda key: key[0] == day)
+    else:
+        availability_cache.invalidate((day, dentist_id))
+
+def get_cache_stats():
+    """Returns hit/miss counters for the in-process caches."""
+    return {
+        "availability": availability_cache.stats(),
+        "dentists": dentist_cache.stats(),
+        "slot_holds": slot_holds.stats(),
+        "principals": principal_cache.stats(),
+        "dashboard": dashboard_cache.stats(),
+        "patients": patient_cache.stats(),
+        "patient_overviews": patient_overview_cache.stats(),
+    }
+
+DENTIST_LIST_QUERY = "SELECT dentist_id, name FROM dentists"
+LAST_VISIT_QUERY = "SELECT dentist_id FROM appointments WHERE patient_id = %s ORDER BY appointment_date DESC LIMIT 1"
+
+def _load_dentists(patient_id: int = None):
+    """
+    Returns (dentist_map, dentist_search_order, preferred_id).
+    The patient's last-visited dentist, if any, is searched first.
+    """
+    dentist_map = dentist_cache.get("all")
+    if dentist_map is None:
+        all_dentists = _run_query(DENTIST_LIST_QUERY)
+        dentist_map = {d['dentist_id']: d['name'] for d in all_dentists or []}
+        if dentist_map:
+            dentist_cache.set("all", dentist_map)
+    preferred_id = None
+    if patient_id and dentist_map:
+        overview = patient_overview_cache.get(patient_id)
+        if overview is not None:
+            last_dentist = overview['last_dentist']
+        else:
+            last_dentist = _run_query(LAST_VISIT_QUERY, (patient_id,), fetch='one')
+        if last_dentist and last_dentist['dentist_id'] in dentist_map:
+            preferred_id = last_dentist['dentist_id']
+    dentist_search_order = list(dentist_map.keys())
+    if preferred_id is not None:
+        dentist_search_order.remove(preferred_id)
+        dentist_search_order.insert(0, preferred_id)
+    return dentist_map, dentist_search_order, preferred_id
 
 @mcp.tool()
-def check_availability(appointment_date: str, patient_id: int = None, appointment_start_time: str = None) -> dict:
-    # ... (function contents are unchanged) ...
+def check_availability(appointment_date: str, patient_id: int = None, appointment_start_time: str = None, appointment_type: str = None) -> dict:
     try:
-        start_date_obj = None
-        if appointment_date.lower() == "today": start_date_obj = date.today()
-        elif appointment_date.lower() == "tomorrow": start_date_obj = date.today() + timedelta(days=1)
-        else: start_date_obj = datetime.strptime(appointment_date, "%Y-%m-%d").date()
-        dentist_list_query = "SELECT dentist_id, name FROM dentists"
-        all_dentists = _run_query(dentist_list_query)
-        if not all_dentists: return {"status": "Failed", "message": "No dentists are configured."}
-        dentist_map = {d['dentist_id']: d['name'] for d in all_dentists}
-        dentist_search_order = []
-        if patient_id:
-            last_visit_query = "SELECT dentist_id FROM appointments WHERE patient_id = %s ORDER BY appointment_date DESC LIMIT 1"
-            last_dentist = _run_query(last_visit_query, (patient_id,), fetch='one')
-            if last_dentist:
-                preferred_id = last_dentist['dentist_id']
-                dentist_search_order.append(preferred_id)
-                dentist_search_order.extend([d_id for d_id in dentist_map if d_id != preferred_id])
-            else: dentist_search_order = list(dentist_map.keys())
-        else: dentist_search_order = list(dentist_map.keys())
+        start_date_obj = _parse_requested_date(appointment_date)
+        try:
+            duration = CLINIC_CALENDAR.duration_for(appointment_type)
+        except ValueError as e:
+            return {"status": "Failed", "message": str(e)}
+        dentist_map, dentist_search_order, _ = _load_dentists(patient_id)
+        if not dentist_map: return {"status": "Failed", "message": "No dentists are configured."}
+        window = _load_availability_window(start_date_obj, dentist_search_order, holder=patient_id, duration=duration)
         now = datetime.now()
-        current_date = start_date_obj
-        end_date = current_date + timedelta(days=14)
-        while current_date <= end_date:
-            if current_date.weekday() < 6:
-                booked_slots_q = "SELECT dentist_id, appointment_start_time FROM appointments WHERE appointment_date = %s AND status = 'Scheduled'"
-                all_day_bookings = _run_query(booked_slots_q, (current_date,))
-                booked_by_dentist = {}
-                for booking in all_day_bookings:
-                    d_id = booking['dentist_id']
-                    if d_id not in booked_by_dentist: booked_by_dentist[d_id] = set()
-                    booked_by_dentist[d_id].add(str(booking['appointment_start_time']))
-                if appointment_start_time:
-                    for dentist_id in dentist_search_order:
-                        if appointment_start_time not in booked_by_dentist.get(dentist_id, set()):
-                            return {"status": "Success", "earliest_slot": {"date": str(current_date), "time": appointment_start_time}, "dentist_id": dentist_id, "dentist_name": dentist_map[dentist_id]}
-                else:
-                    time_slots = _get_available_time_slots()
-                    if current_date == now.date(): time_slots = [s for s in time_slots if datetime.strptime(s, "%H:%M:%S").time() > now.time()]
-                    if time_slots:
-                        for slot in time_slots:
-                            for dentist_id in dentist_search_order:
-                                if slot not in booked_by_dentist.get(dentist_id, set()):
-                                    return {"status": "Success", "earliest_slot": {"date": str(current_date), "time": slot}, "dentist_id": dentist_id, "dentist_name": dentist_map[dentist_id]}
-            current_date += timedelta(days=1)
+        if appointment_start_time:
+            found = window.earliest_at(appointment_start_time, dentist_search_order, now)
+        else:
+            found = window.earliest(dentist_search_order, now)
+        if found:
+            slot_date, slot_time, dentist_id = found
+            _hold_offers(patient_id, [found], duration)
+            return {"status": "Success", "earliest_slot": {"date": str(slot_date), "time": slot_time}, "dentist_id": dentist_id, "dentist_name": dentist_map[dentist_id], "duration_minutes": duration}
         return {"status": "Failed", "message": "No available slots found."}
     except Exception as e:
         return {"status": "Error", "message": str(e)}
 
+MAX_SLOT_OPTIONS = 10
+SCHEDULE_MAX_DAYS = 62
+
+def get_schedule_matrix(start_date: date, end_date: date) -> OccupancyMatrix:
+    """
+    Builds the admin schedule grid (every dentist x day x slot) for a date
+    range from one range query. Raises ValueError for an invalid range.
+    """
+    if end_date < start_date:
+        raise ValueError("'to' must not be before 'from'.")
+    if (end_date - start_date).days + 1 > SCHEDULE_MAX_DAYS:
+        raise ValueError(f"The schedule covers at most {SCHEDULE_MAX_DAYS} days per request.")
+    dentist_map, _, _ = _load_dentists()
+    bookings = _run_query(BOOKED_SLOTS_QUERY, (start_date, end_date))
+    booked = build_booked_masks(SLOT_GRID, bookings or [])
+    return OccupancyMatrix(CLINIC_CALENDAR, start_date, end_date, dentist_map, booked)
+
+@mcp.tool()
+def find_available_slots(appointment_date: str, patient_id: int = None, count: int = 3, time_preference: str = None, appointment_type: str = None) -> dict:
+    """
+    Returns up to `count` free slots across all dentists in one search,
+    ranked by date, the patient's last-visited dentist, and time_preference
+    ("morning", "afternoon", "evening" or a time such as "15:00").
+    Every slot is long enough for `appointment_type` (default length if omitted).
+    """
+    try:
+        start_date_obj = _parse_requested_date(appointment_date)
+        count = max(1, min(int(count or 1), MAX_SLOT_OPTIONS))
+        try:
+            parse_preference(time_preference)
+        except ValueError as e:
+            return {"status": "Failed", "message": str(e)}
+        try:
+            duration = CLINIC_CALENDAR.duration_for(appointment_type)
+        except ValueError as e:
+            return {"status": "Failed", "message": str(e)}
+        dentist_map, dentist_search_order, preferred_id = _load_dentists(patient_id)
+        if not dentist_map: return {"status": "Failed", "message": "No dentists are configured."}
+        window = _load_availability_window(start_date_obj, dentist_search_order, holder=patient_id, duration=duration)
+        ranked = window.ranked(dentist_search_order, count, preferred_id=preferred_id,
+                               preference=time_preference, now=datetime.now())
+        if not ranked:
+            return {"status": "Failed", "message": "No available slots found."}
+        _hold_offers(patient_id, ranked, duration)
+        slots = [
+            {"date": str(slot_date), "time": slot_time, "dentist_id": dentist_id, "dentist_name": dentist_map[dentist_id]}
+            for slot_date, slot_time, dentist_id in ranked
+        ]
+        return {"status": "Success", "slots": slots, "duration_minutes": duration}
+    except Exception as e:
+        return {"status": "Error", "message": str(e)}
+
+SLOT_LOCK_TIMEOUT_SECONDS = int(os.getenv("SLOT_LOCK_TIMEOUT_SECONDS", "5"))
+
+SLOT_CONFLICT_QUERY = """
+    SELECT appointment_id FROM appointments
+    WHERE dentist_id = %s AND appointment_date = %s AND status = 'Scheduled'
+      AND appointment_start_time < ADDTIME(%s, %s) AND appointment_end_time > %s
+    LIMIT 1 FOR UPDATE
+"""
+
+def _reserve_slot(patient_id: int, dentist_id: int, appointment_date: str, appointment_start_time: str,
+                  duration: int, reason: str = None):
+    """
+    Claims `duration` minutes from the start time atomically and returns the new
+    appointment_id, or None if any existing appointment overlaps them.
+    A MySQL named lock per (dentist, date) serialises concurrent bookers across
+    processes; the overlap check (a locking read, so it sees the latest commits)
+    and the INSERT share one transaction that is committed before the lock is released.
+    """
+    lock_name = f"dentist_slot:{dentist_id}:{appointment_date}"
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(dictionary=True, buffered=True)
+        locked = False
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (lock_name, SLOT_LOCK_TIMEOUT_SECONDS))
+            locked = bool(cursor.fetchone()['acquired'])
+            if not locked:
+                raise TimeoutError("Timed out waiting for another booking of this dentist and date to finish.")
+            length = format_minutes(duration)
+            cursor.execute(SLOT_CONFLICT_QUERY, (dentist_id, appointment_date, appointment_start_time, length, appointment_start_time))
+            if cursor.fetchone():
+                conn.rollback()
+                return None
+            insert_query = "INSERT INTO appointments (dentist_id, patient_id, appointment_date, appointment_start_time, appointment_end_time, reason) VALUES (%s, %s, %s, %s, ADDTIME(%s, %s), %s)"
+            params = (dentist_id, patient_id, appointment_date, appointment_start_time, appointment_start_time, length, reason)
+            cursor.execute(insert_query, params)
+            appointment_id = cursor.lastrowid
+            apply_rollup_delta(cursor, appointment_date, dentist_id, 'Scheduled', 1)
+            waitlist.close_satisfied_entries(cursor, patient_id, appointment_date, dentist_id,
+                                             to_minutes(appointment_start_time))
+            conn.commit()
+            return appointment_id
+        finally:
+            if locked:
+                cursor.execute("DO RELEASE_LOCK(%s)", (lock_name,))
+            cursor.close()
+
+def _slot_taken_result(patient_id: int, dentist_id: int, appointment_date: str, duration: int = None) -> dict:
+    """Builds the "slot taken" reply, including the next free slot (same dentist first)."""
+    _invalidate_availability(appointment_date, dentist_id)
+    result = {"status": "Failed", "reason": "slot_taken", "message": "That time was just taken by another caller."}
+    dentist_map, dentist_search_order, _ = _load_dentists(patient_id)
+    if dentist_id in dentist_map:
+        dentist_search_order.remove(dentist_id)
+        dentist_search_order.insert(0, dentist_id)
+    window = _load_availability_window(_parse_requested_date(appointment_date), dentist_search_order,
+                                       holder=patient_id, duration=duration)
+    found = window.earliest(dentist_search_order, datetime.now())
+    if found:
+        slot_date, slot_time, alt_dentist_id = found
+        _hold_offers(patient_id, [found], duration or CLINIC_CALENDAR.default_duration)
+        result["next_available"] = {"date": str(slot_date), "time": slot_time, "dentist_id": alt_dentist_id, "dentist_name": dentist_map[alt_dentist_id]}
+    return result
+
+PATIENT_CONTACT_QUERY = "SELECT full_name, phone FROM patients WHERE patient_id = %s"
+
 @mcp.tool()
-def book_dentist_appointment(patient_id: int, dentist_id: int, appointment_date: str, appointment_start_time: str, reason: str = None) -> dict:
-    # ... (function contents are unchanged) ...
+def book_dentist_appointment(patient_id: int, dentist_id: int, appointment_date: str, appointment_start_time: str, reason: str = None, appointment_type: str = None) -> dict:
     try:
-        insert_query = "INSERT INTO appointments (dentist_id, patient_id, appointment_date, appointment_start_time, appointment_end_time, reason) VALUES (%s, %s, %s, %s, ADDTIME(%s, '00:30:00'), %s)"
-        params = (dentist_id, patient_id, appointment_date, appointment_start_time, appointment_start_time, reason)
-        insert_result = _run_query(insert_query, params)
-        appointment_id = insert_result.get('last_id') if insert_result else None
+        slot_day = _parse_requested_date(appointment_date)
+        slot_minute = to_minutes(appointment_start_time)
+        try:
+            duration = CLINIC_CALENDAR.duration_for(appointment_type)
+        except ValueError as e:
+            return {"status": "Failed", "reason": "unknown_appointment_type", "message": str(e)}
+        if not CLINIC_CALENDAR.is_bookable(slot_day, dentist_id, slot_minute, duration):
+            return {"status": "Failed", "reason": "outside_working_hours", "message": "The dentist is not working for that whole appointment."}
+        slot_end = slot_minute + duration
+        for start, end, holder in slot_holds.held_spans(slot_day, dentist_id, exclude_holder=patient_id):
+            if holder is not None and start < slot_end and end > slot_minute:
+                return _slot_taken_result(patient_id, dentist_id, appointment_date, duration)
+        appointment_id = _reserve_slot(patient_id, dentist_id, appointment_date, appointment_start_time,
+                                       duration, reason or appointment_type)
         if not appointment_id:
-            return {"status": "Failed", "message": "Failed to book the appointment in the database."}
+            return _slot_taken_result(patient_id, dentist_id, appointment_date, duration)
+        slot_holds.release(slot_day, dentist_id, slot_minute, converted=True)
+        # The caller has picked a slot; free the alternatives they were offered
+        slot_holds.release_holder(patient_id)
+        dashboard_cache.clear()
+        _invalidate_availability(appointment_date, dentist_id)
+        _invalidate_patient_overview(patient_id)
         try:
-            patient_details_query = "SELECT full_name, phone FROM patients WHERE patient_id = %s"
-            patient_info = _run_query(patient_details_query, (patient_id,), fetch='one')
+            patient_info = _run_query(PATIENT_CONTACT_QUERY, (patient_id,), fetch='one')
             if patient_info and patient_info.get('phone'):
                 friendly_date = datetime.strptime(appointment_date, "%Y-%m-%d").strftime("%A, %B %d, %Y")
                 friendly_time = datetime.strptime(appointment_start_time, "%H:%M:%S").strftime("%I:%M %p")
@@ -247,232 +678,480 @@ def book_dentist_appointment(patient_id: int, dentist_id: int, appointment_date:
                 )
                 _send_whatsapp_confirmation(patient_info['phone'], message)
             else:
-                print("  - ⚠️ Could not find patient phone number for WhatsApp notification.")
-        except Exception as e:
-            print(f"  - ❌ An error occurred during the notification step: {e}")
+                log.warning("no phone number for booking confirmation", extra={"patient_id": patient_id})
+        except Exception:
+            log.exception("booking confirmation failed", extra={"patient_id": patient_id})
         return {"status": "Success", "message": f"Appointment confirmed! Your appointment ID is {appointment_id}."}
     except Exception as e:
-        print(f"  - ❌ MCP EXCEPTION in book_dentist_appointment: {e}")
+        log.exception("book_dentist_appointment failed", extra={"tool": "book_dentist_appointment"})
         return {"status": "Error", "message": str(e)}
     
     
 @mcp.tool()
 def get_patient_appointments(phone: str) -> dict:
-    # ... (function contents are unchanged) ...
     try:
-        patient_query = "SELECT patient_id FROM patients WHERE phone = %s"
-        patient_result = _run_query(patient_query, (phone,), fetch='one')
-        if not patient_result:
+        overview = _load_patient_overview(phone)
+        if not overview:
             return {"status": "Failed", "message": "No patient found with this phone number."}
-        patient_id = patient_result['patient_id']
-        appointments_query = """
-            SELECT appointment_date, appointment_start_time
-            FROM appointments
-            WHERE patient_id = %s AND status = 'Scheduled' AND appointment_date >= CURDATE()
-            ORDER BY appointment_date, appointment_start_time
-        """
-        appointments = _run_query(appointments_query, (patient_id,), fetch='all')
-        if not appointments:
+        if not overview['appointments']:
             return {"status": "Failed", "message": "No upcoming appointments found for this patient."}
         appointment_list = [
-            {
-                "date": str(appt['appointment_date']),
-                "time": str(appt['appointment_start_time'])
-            } for appt in appointments
+            {"date": appt['date'], "time": appt['time']} for appt in overview['appointments']
         ]
         return {"status": "Success", "appointments": appointment_list}
     except Exception as e:
-        print(f"  - ❌ MCP EXCEPTION in get_patient_appointments: {e}")
+        log.exception("get_patient_appointments failed", extra={"tool": "get_patient_appointments"})
         return {"status": "Error", "message": str(e)}
 
+CANCELLABLE_APPOINTMENTS_QUERY = """
+    SELECT appointment_id, dentist_id, appointment_date, appointment_start_time
+    FROM appointments
+    WHERE patient_id = %s AND appointment_date = %s AND status = 'Scheduled'
+    FOR UPDATE
+"""
+
+def _cancel_scheduled(patient_id: int, appointment_date: str) -> list:
+    """
+    Cancels a patient's Scheduled appointments on a date and moves their rollup
+    counts from Scheduled to Cancelled in the same transaction.
+    Returns the cancelled rows (dentist_id, appointment_date, appointment_start_time).
+    """
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(dictionary=True, buffered=True)
+        try:
+            cursor.execute(CANCELLABLE_APPOINTMENTS_QUERY, (patient_id, appointment_date))
+            rows = cursor.fetchall()
+            if not rows:
+                conn.rollback()
+                return []
+            ids = [row['appointment_id'] for row in rows]
+            update_query = f"UPDATE appointments SET status = 'Cancelled' WHERE appointment_id IN ({', '.join(['%s'] * len(ids))})"
+            cursor.execute(update_query, tuple(ids))
+            for row in rows:
+                apply_rollup_delta(cursor, row['appointment_date'], row['dentist_id'], 'Scheduled', -1)
+                apply_rollup_delta(cursor, row['appointment_date'], row['dentist_id'], 'Cancelled', 1)
+            conn.commit()
+            return rows
+        finally:
+            cursor.close()
+
 @mcp.tool()
 def cancel_booking(phone: str, appointment_date: str) -> dict:
-    # ... (function contents are unchanged) ...
     try:
-        patient_query = "SELECT patient_id, full_name FROM patients WHERE phone = %s"
-        patient_result = _run_query(patient_query, (phone,), fetch='one')
+        patient_result = find_patient_by_phone(phone)
         if not patient_result:
             return {"status": "Failed", "message": "No patient found with this phone number."}
         patient_id = patient_result['patient_id']
         full_name = patient_result['full_name']
-        update_query = """
-            UPDATE appointments
-            SET status = 'Cancelled'
-            WHERE patient_id = %s AND appointment_date = %s AND status = 'Scheduled'
-        """
-        params = (patient_id, appointment_date)
-        update_result = _run_query(update_query, params)
-        if update_result and update_result.get('affected_rows', 0) > 0:
+        cancelled = _cancel_scheduled(patient_id, appointment_date)
+        if cancelled:
+            for dentist_id in {row['dentist_id'] for row in cancelled}:
+                _invalidate_availability(appointment_date, dentist_id)
+            dashboard_cache.clear()
+            _invalidate_patient_overview(patient_id)
+            for row in cancelled:
+                try:
+                    _offer_to_waitlist(row['appointment_date'], row['dentist_id'], to_minutes(row['appointment_start_time']))
+                except Exception:
+                    log.exception("waitlist backfill failed", extra={"dentist_id": row['dentist_id']})
             try:
                 friendly_date = datetime.strptime(appointment_date, "%Y-%m-%d").strftime("%A, %B %d, %Y")
                 message = f"Hello {full_name},\n\nThis is a confirmation that your dental appointment for *{friendly_date}* has been successfully cancelled."
                 _send_whatsapp_confirmation(phone, message)
-            except Exception as e:
-                print(f"  - ❌ Failed to send cancellation confirmation WhatsApp: {e}")
+            except Exception:
+                log.exception("cancellation confirmation failed", extra={"patient_id": patient_id})
             return {"status": "Success", "message": "The appointment has been successfully cancelled."}
         else:
             return {"status": "Failed", "message": "Could not find a scheduled appointment on that date to cancel."}
     except Exception as e:
-        print(f"  - ❌ MCP EXCEPTION in cancel_booking: {e}")
+        log.exception("cancel_booking failed", extra={"tool": "cancel_booking"})
         return {"status": "Error", "message": str(e)}
 
 
+# --- Waitlist: patients waiting for an earlier slot get offered cancellations ---
+WAITLIST_MAX_DAYS = 30
+WAITLIST_MATCH_CANDIDATES = 20
+# A slot offered from the waitlist stays held long enough to answer a WhatsApp message
+WAITLIST_OFFER_HOLD_SECONDS = float(os.getenv("WAITLIST_OFFER_HOLD_SECONDS", "900"))
+
+@mcp.tool()
+def join_waitlist(patient_id: int, earliest_date: str, latest_date: str = None, dentist_id: int = None,
+                  time_preference: str = None, appointment_type: str = None) -> dict:
+    """
+    Puts a patient on the waitlist for any slot between earliest_date and
+    latest_date (default: the same day), optionally with one dentist and a
+    time preference ("morning", "afternoon", "evening" or "15:00").
+    They get a WhatsApp offer as soon as a matching slot is cancelled.
+    """
+    try:
+        earliest = max(_parse_requested_date(earliest_date), date.today())
+        latest = _parse_requested_date(latest_date) if latest_date else earliest
+        if latest < earliest:
+            return {"status": "Failed", "message": "The latest date must not be before the earliest date."}
+        if (latest - earliest).days + 1 > WAITLIST_MAX_DAYS:
+            return {"status": "Failed", "message": f"The waitlist covers at most {WAITLIST_MAX_DAYS} days."}
+        try:
+            parse_preference(time_preference)
+        except ValueError as e:
+            return {"status": "Failed", "message": str(e)}
+        try:
+            CLINIC_CALENDAR.duration_for(appointment_type)
+        except ValueError as e:
+            return {"status": "Failed", "message": str(e)}
+        with db_pool.connection() as conn:
+            waitlist_id = waitlist.add_entry(conn, patient_id, earliest, latest, dentist_id, time_preference, appointment_type)
+        return {"status": "Success", "waitlist_id": waitlist_id,
+                "message": "You're on the waitlist. We'll message you on WhatsApp if a slot opens up."}
+    except Exception as e:
+        log.exception("join_waitlist failed", extra={"tool": "join_waitlist"})
+        return {"status": "Error", "message": str(e)}
+
+@mcp.tool()
+def leave_waitlist(patient_id: int) -> dict:
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                closed = waitlist.close_entries(cursor, patient_id, 'Left')
+                conn.commit()
+            finally:
+                cursor.close()
+        if not closed:
+            return {"status": "Failed", "message": "This patient is not on the waitlist."}
+        return {"status": "Success", "message": "You have been removed from the waitlist."}
+    except Exception as e:
+        log.exception("leave_waitlist failed", extra={"tool": "leave_waitlist"})
+        return {"status": "Error", "message": str(e)}
+
+def _offer_to_waitlist(day: date, dentist_id: int, minute: int):
+    """
+    Offers a freed slot to the longest-waiting matching patient: holds it for
+    them and sends a WhatsApp message. Returns the waitlist_id offered, or None.
+    """
+    try:
+        candidates = _run_query(waitlist.WAITLIST_MATCH_QUERY, (day, dentist_id, WAITLIST_MATCH_CANDIDATES))
+    except mysql.connector.errors.ProgrammingError as err:
+        if err.errno == MISSING_TABLE_ERRNO:
+            return None
+        raise
+    now = datetime.now()
+    for candidate in candidates or []:
+        if not waitlist.matches_preference(candidate['time_preference'], minute):
+            continue
+        try:
+            duration = CLINIC_CALENDAR.duration_for(candidate['appointment_type'])
+        except ValueError:
+            # The type was removed from the calendar since they joined; like the tools, don't guess a length
+            log.warning("waitlist entry has an unknown appointment type",
+                        extra={"waitlist_id": candidate['waitlist_id'], "appointment_type": candidate['appointment_type']})
+            continue
+        window = _load_availability_window(day, [dentist_id], holder=candidate['patient_id'], duration=duration, days=0)
+        if not window.is_free(day, dentist_id, minute, now):
+            continue
+        if not slot_holds.hold(day, dentist_id, minute, holder=candidate['patient_id'], length=duration,
+                               ttl=WAITLIST_OFFER_HOLD_SECONDS):
+            continue
+        _run_query("UPDATE waitlist_entries SET last_offered_at = NOW() WHERE waitlist_id = %s",
+                   (candidate['waitlist_id'],))
+        dentist_map, _, _ = _load_dentists()
+        friendly_date = day.strftime("%A, %B %d, %Y")
+        friendly_time = datetime.strptime(format_minutes(minute), "%H:%M:%S").strftime("%I:%M %p")
+        message = (
+            f"Hello {candidate['full_name']},\n\n"
+            f"Good news: a slot has opened with {dentist_map.get(dentist_id, 'our dentist')} "
+            f"on *{friendly_date}* at *{friendly_time}*.\n\n"
+            f"We're holding it for you for the next {int(WAITLIST_OFFER_HOLD_SECONDS // 60)} minutes. "
+            f"Call us to confirm the booking."
+        )
+        if candidate.get('phone'):
+            _send_whatsapp_confirmation(candidate['phone'], message)
+        log.info("waitlist offer", extra={"waitlist_id": candidate['waitlist_id'], "dentist_id": dentist_id,
+                                          "date": str(day), "time": format_minutes(minute)})
+        return candidate['waitlist_id']
+    return None
+
+
 # --- Dashboard Function (NOT a tool, called by bridge) ---
-def get_dashboard_stats():
-    # ... (function contents are unchanged) ...
-    query = """
-    SELECT
-        (SELECT COUNT(*) FROM appointments WHERE appointment_date = CURDATE() AND status = 'Scheduled') AS todays_bookings,
-        (SELECT COUNT(*) FROM appointments WHERE appointment_date >= CURDATE() - INTERVAL 7 DAY AND status = 'Scheduled') AS weekly_bookings,
-        (SELECT COUNT(*) FROM appointments WHERE appointment_date >= CURDATE() - INTERVAL 30 DAY AND status = 'Scheduled') AS monthly_bookings,
-        (SELECT COUNT(*) FROM appointments WHERE appointment_date >= CURDATE() AND status = 'Scheduled') AS pending_jobs,
-        (SELECT COUNT(*) FROM appointments WHERE appointment_date >= CURDATE() - INTERVAL 30 DAY AND status = 'Cancelled') AS cancellations
+# All dashboard payloads come from the per-day rollup counters (plus the
+# joined list of today's bookings). The result is cached briefly so the four
+# dashboard endpoints, which the admin page calls in parallel, share it.
+dashboard_cache = TTLCache(maxsize=1, ttl=float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "5")))
+_dashboard_lock = threading.Lock()
+
+DAILY_STATUS_COUNTS_QUERY = """
+    SELECT appointment_date, status, COUNT(*) AS bookings
+    FROM appointments
+    WHERE appointment_date >= %s
+    GROUP BY appointment_date, status
+"""
+
+def _load_daily_status_counts(since: date) -> dict:
+    """
+    Returns {(appointment_date, status): count} for every appointment on or after `since`.
+    Reads the appointment_daily_rollup counters, falling back to a grouped scan
+    of appointments until that table has been backfilled.
+    """
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(dictionary=True, buffered=True)
+        try:
+            counts = load_daily_status_counts(cursor, since)
+        finally:
+            cursor.close()
+    if counts is not None:
+        return counts
+    results = _run_query(DAILY_STATUS_COUNTS_QUERY, (since,), fetch='all')
+    return {(row['appointment_date'], row['status']): int(row['bookings']) for row in results or []}
+
+def _count_between(counts: dict, status: str, start: date, end: date = None) -> int:
+    return sum(
+        n for (day, day_status), n in counts.items()
+        if day_status == status and day >= start and (end is None or day <= end)
+    )
+
+def _build_dashboard_stats(counts: dict, today: date) -> dict:
+    return {
+        "todays_bookings": _count_between(counts, 'Scheduled', today, today),
+        "weekly_bookings": _count_between(counts, 'Scheduled', today - timedelta(days=7)),
+        "monthly_bookings": _count_between(counts, 'Scheduled', today - timedelta(days=30)),
+        "pending_jobs": _count_between(counts, 'Scheduled', today),
+        "revenue_today": None, "revenue_month": None,
+        "avg_turnaround_hr": None,
+        "cancellations": _count_between(counts, 'Cancelled', today - timedelta(days=30)),
+    }
+
+def _build_chart_data(counts: dict, today: date) -> list:
+    last_day_num = calendar.monthrange(today.year, today.month)[1]
+    return [
+        {"date": str(day), "bookings": counts.get((day, 'Scheduled'), 0)}
+        for day in (today.replace(day=n) for n in range(1, last_day_num + 1))
+    ]
+
+def _build_monthly_breakdown(counts: dict, today: date) -> list:
+    month_map = {}
+    for i in range(1, 13):
+        month_map[i] = {
+            "month": calendar.month_name[i],
+            "bookings": 0,
+            "cancellations": 0
+        }
+    for (day, day_status), n in counts.items():
+        if day.year != today.year:
+            continue
+        if day_status == 'Scheduled':
+            month_map[day.month]['bookings'] += n
+        elif day_status == 'Cancelled':
+            month_map[day.month]['cancellations'] += n
+    return list(month_map.values())
+
+TODAYS_BOOKINGS_QUERY = """
+    SELECT 
+        p.full_name AS patient_name,
+        d.name AS dentist_name,
+        a.appointment_date,
+        a.appointment_start_time,
+        a.appointment_end_time
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.patient_id
+    JOIN dentists d ON a.dentist_id = d.dentist_id
+    WHERE 
+        a.appointment_date = CURDATE()
+        AND a.status = 'Scheduled'
+    ORDER BY 
+        a.appointment_start_time
+"""
+
+def _load_todays_bookings() -> list:
+    results = _run_query(TODAYS_BOOKINGS_QUERY, fetch='all')
+    return [
+        {
+            "patient_name": row['patient_name'],
+            "dentist_name": row['dentist_name'],
+            "date": str(row['appointment_date']),
+            "time": str(row['appointment_start_time']),
+            "end_time": str(row['appointment_end_time'])
+        } for row in results or []
+    ]
+
+def get_dashboard_overview():
     """
+    Returns stats, chart_data, todays_bookings and monthly_breakdown together.
+    Concurrent callers on a cold cache wait for a single computation.
+    """
+    overview = dashboard_cache.get("overview")
+    if overview is not None:
+        return overview
+    with _dashboard_lock:
+        overview = dashboard_cache.get("overview")
+        if overview is not None:
+            return overview
+        today = date.today()
+        since = min(today.replace(month=1, day=1), today - timedelta(days=30))
+        counts = _load_daily_status_counts(since)
+        overview = {
+            "stats": _build_dashboard_stats(counts, today),
+            "chart_data": _build_chart_data(counts, today),
+            "todays_bookings": _load_todays_bookings(),
+            "monthly_breakdown": _build_monthly_breakdown(counts, today),
+        }
+        dashboard_cache.set("overview", overview)
+        return overview
+
+def get_dashboard_stats():
     default_stats = {
         "todays_bookings": 0, "weekly_bookings": 0, "monthly_bookings": 0,
         "pending_jobs": 0, "revenue_today": None, "revenue_month": None,
         "avg_turnaround_hr": None, "cancellations": 0
     }
     try:
-        stats = _run_query(query, fetch='one')
-        if not stats:
-            return default_stats
-        stats['avg_turnaround_hr'] = None 
-        stats['revenue_today'] = None   
-        stats['revenue_month'] = None 
-        return stats
-    except Exception as e:
-        print(f"  - ❌ Error in get_dashboard_stats: {e}")
+        return get_dashboard_overview()["stats"]
+    except Exception:
+        log.exception("get_dashboard_stats failed")
         return default_stats
 
 def get_chart_data():
-    # ... (function contents are unchanged) ...
-    today = datetime.now().date()
-    first_day_of_month = today.replace(day=1)
-    last_day_num = calendar.monthrange(today.year, today.month)[1]
-    last_day_of_month = today.replace(day=last_day_num)
-    date_map = {}
-    current_day = first_day_of_month
-    while current_day <= last_day_of_month:
-        date_map[current_day.strftime("%Y-%m-%d")] = 0
-        current_day += timedelta(days=1)
-    query = """
-    SELECT 
-        DATE(appointment_date) as date, 
-        COUNT(*) as bookings
-    FROM appointments
-    WHERE 
-        appointment_date BETWEEN %s AND %s 
-        AND status = 'Scheduled'
-    GROUP BY DATE(appointment_date)
-    """
-    params = (first_day_of_month, last_day_of_month) 
     try:
-        results = _run_query(query, params, fetch='all') 
-        if results:
-            for row in results:
-                date_str = str(row['date'])
-                if date_str in date_map:
-                    date_map[date_str] = row['bookings']
-        chart_data_list = [
-            {"date": date_str, "bookings": count} 
-            for date_str, count in date_map.items()
-        ]
-        chart_data_list.sort(key=lambda x: x['date'])
-        return {"data": chart_data_list}
-    except Exception as e:
-        print(f"  - ❌ Error in get_chart_data: {e}")
+        return {"data": get_dashboard_overview()["chart_data"]}
+    except Exception:
+        log.exception("get_chart_data failed")
         return {"data": []} 
 
 def get_todays_bookings_details():
-    # ... (function contents are unchanged) ...
-    query = """
-        SELECT 
-            p.full_name AS patient_name,
-            d.name AS dentist_name,
-            a.appointment_date,
-            a.appointment_start_time,
-            a.appointment_end_time
-        FROM appointments a
-        JOIN patients p ON a.patient_id = p.patient_id
-        JOIN dentists d ON a.dentist_id = d.dentist_id
-        WHERE 
-            a.appointment_date = CURDATE()
-            AND a.status = 'Scheduled'
-        ORDER BY 
-            a.appointment_start_time;
-    """
     try:
-        results = _run_query(query, fetch='all')
-        if not results:
-            return {"data": []}
-        formatted_data = []
-        for row in results:
-            formatted_data.append({
-                "patient_name": row['patient_name'],
-                "dentist_name": row['dentist_name'],
-                "date": str(row['appointment_date']),
-                "time": str(row['appointment_start_time']),
-                "end_time": str(row['appointment_end_time'])
-            })
-        return {"data": formatted_data}
-    except Exception as e:
-        print(f"  - ❌ Error in get_todays_bookings_details: {e}")
+        return {"data": get_dashboard_overview()["todays_bookings"]}
+    except Exception:
+        log.exception("get_todays_bookings_details failed")
         return {"data": []}
 
 @mcp.tool()
 def get_monthly_breakdown_chart_data():
-    # ... (function contents are unchanged) ...
-    month_map = {}
-    for i in range(1, 13):
-        month_map[i] = {
-            "month": calendar.month_name[i],
-            "bookings": 0,
-            "cancellations": 0
-        }
-    query = """
-    SELECT
-        MONTH(appointment_date) as month_num,
-        COUNT(CASE WHEN status = 'Scheduled' THEN 1 ELSE NULL END) as bookings,
-        COUNT(CASE WHEN status = 'Cancelled' THEN 1 ELSE NULL END) as cancellations
-    FROM appointments
-    WHERE
-        YEAR(appointment_date) = YEAR(CURDATE())
-    GROUP BY
-        MONTH(appointment_date)
-    ORDER BY
-        month_num ASC;
-    """
     try:
-        results = _run_query(query, fetch='all')
-        if results:
-            for row in results:
-                month_num = int(row['month_num'])
-                if month_num in month_map:
-                    month_map[month_num]['bookings'] = int(row['bookings'])
-                    month_map[month_num]['cancellations'] = int(row['cancellations'])
-        chart_data_list = list(month_map.values())
-        return {"data": chart_data_list}
-    except Exception as e:
-        print(f"  - ❌ Error in get_monthly_breakdown_chart_data: {e}")
+        return {"data": get_dashboard_overview()["monthly_breakdown"]}
+    except Exception:
+        log.exception("get_monthly_breakdown_chart_data failed")
         return {"data": []} 
 
+# --- Appointment export (NOT a tool, streamed by the bridge) ---
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_COLUMNS = [
+    "appointment_id", "appointment_date", "appointment_start_time", "appointment_end_time",
+    "status", "dentist_id", "dentist_name", "patient_id", "patient_name", "reason",
+]
+# Not a *_QUERY constant: an unfiltered export is a full scan by design
+APPOINTMENT_EXPORT_SQL = """
+    SELECT a.appointment_id, a.appointment_date, a.appointment_start_time, a.appointment_end_time,
+           a.status, a.dentist_id, d.name AS dentist_name,
+           a.patient_id, p.full_name AS patient_name, a.reason
+    FROM appointments a
+    JOIN dentists d ON d.dentist_id = a.dentist_id
+    JOIN patients p ON p.patient_id = a.patient_id
+    {where}
+    ORDER BY a.appointment_date, a.appointment_start_time, a.appointment_id
+"""
+
+def _stream_query(query: str, params: tuple = None, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Yields rows from an unbuffered cursor, `batch_size` at a time, so memory
+    stays flat however many rows match. It uses its own connection rather than
+    a pooled one: a slow download must not hold a connection the voice tools need.
+    """
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params or ())
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        # Closing the connection also drops any rows a cancelled download left unread
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+        conn.close()
+
+def export_appointments(export_format: str = "csv", start_date: date = None, end_date: date = None,
+                        dentist_id: int = None, status: str = None):
+    """
+    Streams appointments matching the filters as CSV or NDJSON text chunks.
+    The query runs before this returns, so database errors surface before any
+    bytes are sent. Returns (chunks, media_type).
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}' (use {' or '.join(EXPORT_FORMATS)}).")
+    conditions, params = [], []
+    if start_date:
+        conditions.append("a.appointment_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("a.appointment_date <= %s")
+        params.append(end_date)
+    if dentist_id is not None:
+        conditions.append("a.dentist_id = %s")
+        params.append(dentist_id)
+    if status:
+        conditions.append("a.status = %s")
+        params.append(status)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = _stream_query(APPOINTMENT_EXPORT_SQL.format(where=where), tuple(params))
+    first = next(rows, None)
+
+    def all_rows():
+        if first is not None:
+            yield first
+            yield from rows
+
+    writer, media_type = EXPORT_FORMATS[export_format]
+    return writer(all_rows(), EXPORT_COLUMNS), media_type
+
+# --- Bulk import (NOT a tool, called by bridge) ---
+def import_records(kind: str, text: str, import_format: str = "csv") -> dict:
+    """
+    Imports patients or appointments from CSV/NDJSON text on a dedicated
+    connection, then drops every cache the new rows could make stale.
+    """
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        summary = run_import(conn, kind, io.StringIO(text, newline=""), import_format)
+    finally:
+        conn.close()
+    if summary["inserted"]:
+        availability_cache.clear()
+        dashboard_cache.clear()
+        patient_overview_cache.clear()
+    return summary
+
+
+
+# --- Metrics: timed statements are labelled with their *_QUERY constant names ---
+metrics.name_queries(globals())
+metrics.Gauge(
+    "dentist_db_pool_connections", "Pooled MySQL connections by state.",
+    lambda: {(state,): value for state, value in db_pool.stats().items() if state in ("open", "in_use", "idle")},
+    ["state"],
+)
 
 
 # --- UPDATED: __all__ must export the new user/auth functions ---
 __all__ = [
     # Vapi Tools
-    "verify_patient", "create_patient", "check_availability", 
+    "verify_patient", "create_patient", "check_availability", "find_available_slots",
     "book_dentist_appointment", "get_patient_appointments", "cancel_booking",
+    "get_patient_overview", "join_waitlist", "leave_waitlist",
     "get_monthly_breakdown_chart_data",
     
     # Dashboard Functions
     "get_dashboard_stats", "get_chart_data",
-    "get_todays_bookings_details",
+    "get_todays_bookings_details", "get_dashboard_overview", "get_schedule_matrix",
+    "export_appointments", "import_records", "get_db_pool_stats", "get_cache_stats",
+    "get_notification_stats", "start_background_workers",
     
     # NEW: Auth & User Functions
-    "get_user_by_email", "create_admin_user", "verify_password"
+    "get_user_by_email", "create_admin_user", "verify_password",
+    "get_cached_principal", "load_principal", "invalidate_principal",
 ]
 
 if __name__ == "__main__":
+    start_background_workers()
     mcp.run("stdio")
\ No newline at end of file
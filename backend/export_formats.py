@@ -0,0 +1,49 @@
+# backend/export_formats.py
+import csv
+import io
+import json
+
+# Rows are written out in chunks of this many, so the response is streamed
+# in a few large writes rather than one per row.
+CHUNK_ROWS = 500
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value)
+
+
+def iter_csv(rows, columns):
+    """Yields CSV text (header first) for an iterable of dict rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 1
+    for row in rows:
+        writer.writerow([_text(row.get(column)) for column in columns])
+        pending += 1
+        if pending >= CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def iter_ndjson(rows, columns):
+    """Yields newline-delimited JSON, one object per row."""
+    lines = []
+    for row in rows:
+        record = {column: row.get(column) for column in columns}
+        lines.append(json.dumps(record, default=str, separators=(",", ":")))
+        if len(lines) >= CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (iter_csv, "text/csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+}
@@ -0,0 +1,200 @@
+# backend/idempotency_store.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from ttl_cache import TTLCache
+
+# A claim whose request never finished (the process died mid-call) is released after this long
+_PENDING_TIMEOUT_SECONDS = 120
+# Expired rows are swept every this many claims
+_PURGE_EVERY = 200
+
+NEW, REPLAY, MISMATCH, IN_PROGRESS = "new", "replay", "mismatch", "in_progress"
+
+
+def fingerprint(arguments: dict) -> str:
+    """A stable hash of a request's arguments, used to spot a key reused for a different request."""
+    canonical = json.dumps(arguments, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Remembers the result of a write request per idempotency key for `ttl` seconds.
+
+    Completed results live in an in-memory TTLCache backed by a local SQLite
+    file, so a retried request is answered without touching MySQL, including
+    after a restart. A retry that arrives while the original is still running
+    waits for it (up to `wait_timeout`) and gets the same result.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400.0, cache_size: int = 4096, wait_timeout: float = 30.0):
+        self.path = path
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._cache = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._claims = 0
+        self._stats = {"claimed": 0, "stored": 0, "replayed": 0, "mismatched": 0, "in_progress": 0}
+        self._init_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _init_schema(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    key TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    response TEXT,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at)")
+        finally:
+            conn.close()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _from_cache(self, key: str, request_fingerprint: str):
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        stored_fingerprint, result = cached
+        if stored_fingerprint != request_fingerprint:
+            self._count("mismatched")
+            return MISMATCH, None
+        self._count("replayed")
+        return REPLAY, result
+
+    def begin(self, key: str, request_fingerprint: str):
+        """
+        Claims `key` for a request. Returns (state, result):
+          ("new", None)        the caller runs the request, then calls finish() or abandon()
+          ("replay", result)   the stored result of an earlier identical request
+          ("mismatch", None)   the key was already used for different arguments
+          ("in_progress", None) another process is still running it, or the wait timed out
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            found = self._from_cache(key, request_fingerprint)
+            if found:
+                return found
+            with self._lock:
+                event = self._inflight.get(key)
+                if event is None:
+                    self._inflight[key] = threading.Event()
+            if event is None:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not event.wait(remaining):
+                self._count("in_progress")
+                return IN_PROGRESS, None
+
+        # This thread owns the key in-process; settle ownership across processes in SQLite
+        try:
+            state, result = self._claim(key, request_fingerprint)
+        except Exception:
+            self._release(key)
+            raise
+        if state != NEW:
+            self._release(key)
+        return state, result
+
+    def _claim(self, key: str, request_fingerprint: str):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT fingerprint, response FROM idempotency_keys WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, response, expires_at) VALUES (?, ?, NULL, ?)",
+                    (key, request_fingerprint, now + _PENDING_TIMEOUT_SECONDS),
+                )
+                self._claims += 1
+                if self._claims % _PURGE_EVERY == 0:
+                    conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        if row is None:
+            self._count("claimed")
+            return NEW, None
+        stored_fingerprint, response = row
+        if stored_fingerprint != request_fingerprint:
+            self._count("mismatched")
+            return MISMATCH, None
+        if response is None:
+            self._count("in_progress")
+            return IN_PROGRESS, None
+        result = json.loads(response)
+        self._cache.set(key, (stored_fingerprint, result))
+        self._count("replayed")
+        return REPLAY, result
+
+    def finish(self, key: str, request_fingerprint: str, result):
+        """Stores the result of a claimed request and wakes any retries waiting for it."""
+        try:
+            self._cache.set(key, (request_fingerprint, result))
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "UPDATE idempotency_keys SET response = ?, expires_at = ? WHERE key = ?",
+                    (json.dumps(result, default=str), time.time() + self.ttl, key),
+                )
+            finally:
+                conn.close()
+            self._count("stored")
+        finally:
+            self._release(key)
+
+    def abandon(self, key: str):
+        """Gives up a claim without storing a result (the request failed), so a retry runs it again."""
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND response IS NULL", (key,))
+            finally:
+                conn.close()
+        finally:
+            self._release(key)
+
+    def _release(self, key: str):
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["in_flight"] = len(self._inflight)
+        snapshot["cache"] = self._cache.stats()
+        snapshot["ttl_seconds"] = self.ttl
+        return snapshot
+
+
+def store_from_env() -> IdempotencyStore:
+    """Builds the shared store from IDEMPOTENCY_* environment variables."""
+    # Relative paths are taken from this directory, whichever directory the server was started in
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.getenv("IDEMPOTENCY_STORE_PATH", "idempotency_keys.db"))
+    return IdempotencyStore(
+        path=path,
+        ttl=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400")),
+        cache_size=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "4096")),
+        wait_timeout=float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30")),
+    )
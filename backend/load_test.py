@@ -0,0 +1,89 @@
+# backend/load_test.py
+"""
+Concurrency load test for the bridge server.
+
+Fires the same Vapi tool call at increasing concurrency levels and prints
+throughput and latency per level, so you can see whether throughput scales
+with the number of simultaneous voice calls.
+
+    python load_test.py --levels 1,2,4,8,16 --requests 200
+    python load_test.py --endpoint /tools/verify-patient --payload '{"phone": "9876543210"}'
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _call(url: str, body: bytes, timeout: float):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            ok = response.status == 200
+    except (urllib.error.URLError, TimeoutError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_level(url: str, body: bytes, concurrency: int, total_requests: int, timeout: float) -> dict:
+    """Sends `total_requests` calls using `concurrency` parallel clients."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: _call(url, body, timeout), range(total_requests)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for latency, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors,
+        "throughput_rps": round((total_requests - errors) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a bridge server /tools endpoint at rising concurrency.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/tools/check-availability")
+    parser.add_argument("--payload", default='{"appointment_date": "tomorrow"}', help="JSON body sent with every call")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per level instead of a table")
+    args = parser.parse_args()
+
+    url = args.base_url.rstrip("/") + args.endpoint
+    body = json.dumps(json.loads(args.payload)).encode()
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+
+    if not args.json:
+        print(f"Load testing {url} ({args.requests} requests per level)")
+        print(f"{'concurrency':>11} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7} {'scaling':>8}")
+    baseline = None
+    for level in levels:
+        result = run_level(url, body, level, args.requests, args.timeout)
+        baseline = baseline or result["throughput_rps"]
+        result["scaling"] = round(result["throughput_rps"] / baseline, 2) if baseline else None
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(f"{level:>11} {result['throughput_rps']:>9} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['errors']:>7} {result['scaling']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# backend/metrics.py
+"""
+In-process counters and latency histograms, rendered in the Prometheus text
+format by the bridge's /metrics endpoint.
+
+Recording is a bisect and an integer increment under a per-metric lock;
+cumulative bucket counts are only computed when /metrics is scraped.
+
+Queries are labelled with the name of the module constant that holds them
+(e.g. BOOKED_SLOTS_QUERY, registered with name_queries()), or else with
+"<verb> <table>" taken from the SQL text.
+"""
+import bisect
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: from a cached lookup (sub-millisecond) to a voice-call budget blown (>5s)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64)
+_LE_INF = 'le="+Inf"'
+
+REGISTRY = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labelnames, labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}"
+
+
+class Gauge:
+    """A gauge read at scrape time from `read()`, which returns {labels tuple: value}."""
+
+    def __init__(self, name: str, help_text: str, read, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.read = read
+        REGISTRY.append(self)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self.read().items():
+            yield f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                yield f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}"
+            cumulative += values[-2]
+            yield f"{self.name}_bucket{_label_text(self.labelnames, labels, _LE_INF)} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, labels)} {_number(values[-1])}"
+            yield f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}"
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# --- Query labels ---
+_query_names = {}
+_derived_labels = {}
+_MAX_DERIVED_LABELS = 1024
+_SQL_SHAPE = re.compile(r"\b(FROM|INTO|UPDATE|JOIN)\s+`?(\w+)", re.IGNORECASE)
+
+
+def name_queries(namespace: dict):
+    """Registers every *_QUERY string in a module namespace under its constant name."""
+    for name, value in namespace.items():
+        if name.endswith("_QUERY") and isinstance(value, str):
+            _query_names[value] = name
+
+
+def query_label(statement) -> str:
+    label = _query_names.get(statement)
+    if label is not None:
+        return label
+    label = _derived_labels.get(statement)
+    if label is None:
+        text = statement.decode() if isinstance(statement, (bytes, bytearray)) else str(statement)
+        words = text.split(None, 1)
+        verb = words[0].lower() if words else "unknown"
+        table = _SQL_SHAPE.search(text)
+        label = f"{verb} {table.group(2)}" if table else verb
+        # IN (%s, %s, ...) lists make many distinct statements; only remember a bounded number
+        if len(_derived_labels) < _MAX_DERIVED_LABELS:
+            _derived_labels[statement] = label
+    return label
+
+
+# --- Per-request DB round trips ---
+_round_trips = contextvars.ContextVar("db_round_trips", default=None)
+
+
+def begin_request():
+    """Starts counting DB round trips for the current context (copied into worker threads)."""
+    return _round_trips.set([0])
+
+
+def end_request(token) -> int:
+    counter = _round_trips.get()
+    _round_trips.reset(token)
+    return counter[0] if counter else 0
+
+
+def observe_query(statement, seconds: float):
+    DB_QUERY_DURATION.observe(seconds, query_label(statement))
+    counter = _round_trips.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+# --- The service's metrics ---
+HTTP_REQUEST_DURATION = Histogram(
+    "dentist_http_request_duration_seconds", "Bridge request latency by route.", ["route", "status"])
+TOOL_DURATION = Histogram(
+    "dentist_tool_duration_seconds", "Latency of each Vapi tool call.", ["tool"])
+TOOL_CALLS = Counter(
+    "dentist_tool_calls_total", "Vapi tool calls by result status.", ["tool", "status"])
+DB_QUERY_DURATION = Histogram(
+    "dentist_db_query_duration_seconds", "MySQL statement latency (one round trip) by query.", ["query"])
+DB_ROUND_TRIPS = Histogram(
+    "dentist_db_round_trips_per_request", "MySQL round trips made while serving one request.", ["route"],
+    buckets=COUNT_BUCKETS)
+DB_CONNECT_DURATION = Histogram(
+    "dentist_db_connect_duration_seconds", "Time to open a new MySQL connection.")
+DB_POOL_WAIT = Histogram(
+    "dentist_db_pool_wait_seconds", "Time spent waiting for a free pooled connection.")
+NOTIFICATION_ENQUEUE_DURATION = Histogram(
+    "dentist_notification_enqueue_seconds", "Time to hand a WhatsApp message to the outbox.")
+NOTIFICATION_SEND_DURATION = Histogram(
+    "dentist_notification_send_seconds", "WhatsApp bridge POST latency.")
+NOTIFICATIONS = Counter(
+    "dentist_notifications_total", "WhatsApp messages by outcome (queued, sent, retried, failed).", ["outcome"])
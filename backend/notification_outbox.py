@@ -0,0 +1,248 @@
+# backend/notification_outbox.py
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from structured_logging import get_logger
+
+log = get_logger("outbox")
+
+# Rows stuck in 'sending' this long belong to a worker that died; hand them out again
+_STALE_CLAIM_SECONDS = 300
+_MAX_BACKOFF_SECONDS = 300
+
+
+class NotificationOutbox:
+    """
+    A durable WhatsApp outbox backed by a local SQLite file.
+    Callers enqueue() and return immediately; a daemon thread claims due rows
+    in batches and posts them to the WhatsApp bridge over a pooled keep-alive
+    session (`concurrency` requests in flight), retrying failures with
+    exponential backoff.
+    """
+
+    def __init__(self, path: str, bridge_url: str, batch_size: int = 20, max_attempts: int = 5,
+                 base_backoff: float = 2.0, poll_interval: float = 1.0, timeout: float = 10.0,
+                 concurrency: int = 4):
+        self.path = path
+        self.bridge_url = bridge_url
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self._wakeup = threading.Event()
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._session = None
+        self._senders = None
+        self._init_schema()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    recipient TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    claimed_by TEXT,
+                    claimed_at REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    sent_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)")
+        finally:
+            conn.close()
+
+    def enqueue(self, recipient: str, message: str) -> int:
+        """Stores a message for background delivery and returns its outbox id."""
+        started = time.perf_counter()
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "INSERT INTO outbox (recipient, message, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                (recipient, message, now, now),
+            )
+            outbox_id = cursor.lastrowid
+        finally:
+            conn.close()
+        metrics.NOTIFICATION_ENQUEUE_DURATION.observe(time.perf_counter() - started)
+        metrics.NOTIFICATIONS.inc("queued")
+        self._ensure_worker()
+        self._wakeup.set()
+        return outbox_id
+
+    def enqueue_many(self, messages) -> int:
+        """Stores (recipient, message) pairs in one transaction. Returns how many were queued."""
+        now = time.time()
+        rows = [(recipient, message, now, now) for recipient, message in messages]
+        if not rows:
+            return 0
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO outbox (recipient, message, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        metrics.NOTIFICATIONS.inc("queued", amount=len(rows))
+        self._ensure_worker()
+        self._wakeup.set()
+        return len(rows)
+
+    def _ensure_worker(self):
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="whatsapp-outbox", daemon=True)
+                self._worker.start()
+
+    def start(self):
+        """Starts the delivery thread (also started lazily by the first enqueue)."""
+        self._ensure_worker()
+
+    def _run(self):
+        while True:
+            try:
+                delivered = self.deliver_due()
+            except Exception:
+                log.exception("whatsapp outbox worker error")
+                delivered = 0
+            if delivered < self.batch_size:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim_batch(self):
+        token = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                UPDATE outbox SET status = 'sending', claimed_by = ?, claimed_at = ?
+                WHERE id IN (
+                    SELECT id FROM outbox
+                    WHERE (status = 'pending' AND next_attempt_at <= ?)
+                       OR (status = 'sending' AND claimed_at <= ?)
+                    ORDER BY id LIMIT ?
+                )
+                """,
+                (token, now, now, now - _STALE_CLAIM_SECONDS, self.batch_size),
+            )
+            return conn.execute("SELECT * FROM outbox WHERE claimed_by = ? AND status = 'sending'", (token,)).fetchall()
+        finally:
+            conn.close()
+
+    def _post(self, row) -> str:
+        """Posts one message; returns None on success or an error string."""
+        payload = {"recipient": row["recipient"], "message": row["message"]}
+        started = time.perf_counter()
+        try:
+            response = self._session.post(self.bridge_url, data=json.dumps(payload), timeout=self.timeout)
+        except requests.exceptions.ReadTimeout:
+            metrics.NOTIFICATION_SEND_DURATION.observe(time.perf_counter() - started)
+            # The Go bridge accepted the request and is still talking to WhatsApp;
+            # it already has the message, so resending would duplicate it.
+            return None
+        except requests.exceptions.RequestException as e:
+            return f"Could not connect to the bridge: {e}"
+        metrics.NOTIFICATION_SEND_DURATION.observe(time.perf_counter() - started)
+        if response.status_code >= 400:
+            return f"Bridge answered HTTP {response.status_code}"
+        return None
+
+    def deliver_due(self) -> int:
+        """Delivers one batch of due messages. Returns how many rows were processed."""
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers.update({"Content-Type": "application/json"})
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+            if self.concurrency > 1:
+                self._senders = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="whatsapp-send")
+        rows = self._claim_batch()
+        if not rows:
+            return 0
+        if self._senders is not None:
+            results = list(self._senders.map(self._post, rows))
+        else:
+            results = [self._post(row) for row in rows]
+        conn = self._connect()
+        try:
+            for row, error in zip(rows, results):
+                now = time.time()
+                attempts = row["attempts"] + 1
+                if error is None:
+                    metrics.NOTIFICATIONS.inc("sent")
+                    conn.execute(
+                        "UPDATE outbox SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+                        (attempts, now, row["id"]),
+                    )
+                elif attempts >= self.max_attempts:
+                    log.error("giving up on whatsapp message", extra={"outbox_id": row["id"], "attempts": attempts, "error": error})
+                    metrics.NOTIFICATIONS.inc("failed")
+                    conn.execute(
+                        "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                        (attempts, error, row["id"]),
+                    )
+                else:
+                    metrics.NOTIFICATIONS.inc("retried")
+                    delay = min(_MAX_BACKOFF_SECONDS, self.base_backoff * 2 ** (attempts - 1))
+                    delay *= random.uniform(0.8, 1.2)
+                    conn.execute(
+                        "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                        (attempts, now + delay, error, row["id"]),
+                    )
+        finally:
+            conn.close()
+        return len(rows)
+
+    def stats(self) -> dict:
+        """Returns message counts per delivery status."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        counts = {"pending": 0, "sending": 0, "sent": 0, "failed": 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+
+def outbox_from_env() -> NotificationOutbox:
+    """Builds the shared outbox from WHATSAPP_* environment variables."""
+    # Relative paths are taken from this directory, whichever directory the server was started in
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.getenv("WHATSAPP_OUTBOX_PATH", "whatsapp_outbox.db"))
+    return NotificationOutbox(
+        path=path,
+        bridge_url=os.getenv("WHATSAPP_BRIDGE_URL", "http://localhost:8080/api/send"),
+        batch_size=int(os.getenv("WHATSAPP_OUTBOX_BATCH_SIZE", "20")),
+        max_attempts=int(os.getenv("WHATSAPP_OUTBOX_MAX_ATTEMPTS", "5")),
+        concurrency=int(os.getenv("WHATSAPP_OUTBOX_CONCURRENCY", "4")),
+    )
@@ -0,0 +1,26 @@
+# backend/phone_numbers.py
+import re
+
+DEFAULT_COUNTRY_CODE = "91"
+_NATIONAL_DIGITS = 10
+
+
+def normalize_phone(raw, country_code: str = DEFAULT_COUNTRY_CODE):
+    """
+    Returns the canonical form of a phone number: country code plus national
+    number, digits only (e.g. "+91 98765-43210", "098765 43210" and
+    "9876543210" all become "919876543210"). Returns None if nothing usable
+    is left after stripping punctuation.
+    """
+    if raw is None:
+        return None
+    digits = re.sub(r"\D", "", str(raw))
+    if digits.startswith("00"):
+        # International dialling prefix
+        digits = digits[2:]
+    if len(digits) == _NATIONAL_DIGITS + 1 and digits.startswith("0"):
+        # Trunk prefix on a national number
+        digits = digits[1:]
+    if len(digits) == _NATIONAL_DIGITS:
+        digits = country_code + digits
+    return digits or None
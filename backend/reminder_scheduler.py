@@ -0,0 +1,149 @@
+# backend/reminder_scheduler.py
+import threading
+import time
+from datetime import datetime, time as clock_time, timedelta
+
+from mysql.connector import errors
+
+import metrics
+from availability import to_minutes
+from db_pool import UNKNOWN_COLUMN_ERRNO
+from phone_numbers import normalize_phone
+from structured_logging import get_logger
+
+log = get_logger("reminders")
+
+# Appointments whose start falls inside the lead window and that have not been
+# reminded yet. The date range keeps it on idx_appointments_date_status_reminder;
+# SKIP LOCKED lets several processes run the scheduler without double-claiming.
+REMINDER_DUE_QUERY = """
+    SELECT a.appointment_id, a.appointment_date, a.appointment_start_time,
+           p.full_name, p.phone, d.name AS dentist_name
+    FROM appointments a
+    JOIN patients p ON p.patient_id = a.patient_id
+    JOIN dentists d ON d.dentist_id = a.dentist_id
+    WHERE a.appointment_date BETWEEN %s AND %s
+      AND a.status = 'Scheduled'
+      AND a.reminder_sent_at IS NULL
+      AND TIMESTAMP(a.appointment_date, a.appointment_start_time) BETWEEN %s AND %s
+    ORDER BY a.appointment_date, a.appointment_start_time
+    LIMIT %s
+    FOR UPDATE OF a SKIP LOCKED
+"""
+
+metrics.name_queries(globals())
+
+
+def reminder_message(row) -> str:
+    minutes = to_minutes(row['appointment_start_time'])
+    start = clock_time(minutes // 60, minutes % 60)
+    friendly_date = row['appointment_date'].strftime("%A, %B %d, %Y")
+    return (
+        f"Hello {row['full_name']},\n\n"
+        f"This is a reminder of your dental appointment with {row['dentist_name']} "
+        f"on *{friendly_date}* at *{start.strftime('%I:%M %p')}*.\n\n"
+        f"We look forward to seeing you!"
+    )
+
+
+class ReminderScheduler:
+    """
+    Sends a WhatsApp reminder `lead_hours` before every Scheduled appointment.
+    Each tick claims due appointments in batches with one range query, hands
+    the messages to the outbox and then commits the reminder_sent_at stamp.
+    Delivery is at-least-once: a failed enqueue leaves the appointments due,
+    and if the commit fails after the enqueue they are queued again next tick.
+    """
+
+    def __init__(self, db_pool, outbox, lead_hours: float = 24.0, interval: float = 60.0, batch_size: int = 200):
+        self.db_pool = db_pool
+        self.outbox = outbox
+        self.lead = timedelta(hours=lead_hours)
+        self.interval = interval
+        self.batch_size = batch_size
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._disabled_reason = None
+        self._stats = {"ticks": 0, "queued": 0, "skipped_no_phone": 0, "last_tick_at": None}
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="appointment-reminders", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while self._disabled_reason is None:
+            try:
+                self.tick()
+            except Exception:
+                log.exception("reminder scheduler error")
+            time.sleep(self.interval)
+
+    def _queue_batch(self, now: datetime):
+        """
+        Claims up to batch_size due appointments, queues their reminders and
+        marks them reminded. The stamp is only committed once the outbox holds
+        the messages, so a failed enqueue leaves them due for the next tick.
+        Returns (rows claimed, messages queued, rows skipped for lack of a phone).
+        """
+        until = now + self.lead
+        with self.db_pool.connection() as conn:
+            cursor = conn.cursor(dictionary=True, buffered=True)
+            try:
+                cursor.execute(REMINDER_DUE_QUERY, (now.date(), until.date(), now, until, self.batch_size))
+                rows = cursor.fetchall()
+                messages, skipped = [], 0
+                if rows:
+                    ids = [row['appointment_id'] for row in rows]
+                    cursor.execute(
+                        f"UPDATE appointments SET reminder_sent_at = %s WHERE appointment_id IN ({', '.join(['%s'] * len(ids))})",
+                        (now, *ids),
+                    )
+                    for row in rows:
+                        phone = normalize_phone(row['phone'])
+                        if phone:
+                            messages.append((phone, reminder_message(row)))
+                        else:
+                            skipped += 1
+                queued = self.outbox.enqueue_many(messages)
+                conn.commit()
+                return len(rows), queued, skipped
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def tick(self, now: datetime = None) -> int:
+        """Queues every reminder that is due now. Returns how many were queued."""
+        now = now or datetime.now()
+        queued = 0
+        while True:
+            try:
+                claimed, batch_queued, skipped = self._queue_batch(now)
+            except errors.ProgrammingError as err:
+                if err.errno != UNKNOWN_COLUMN_ERRNO:
+                    raise
+                self._disabled_reason = "appointments.reminder_sent_at is missing; run `python schema_migrations.py migrate`"
+                log.warning("reminders disabled", extra={"reason": self._disabled_reason})
+                return queued
+            queued += batch_queued
+            with self._stats_lock:
+                self._stats["skipped_no_phone"] += skipped
+            if claimed < self.batch_size:
+                break
+        with self._stats_lock:
+            self._stats["ticks"] += 1
+            self._stats["queued"] += queued
+            self._stats["last_tick_at"] = now.isoformat(timespec="seconds")
+        return queued
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        snapshot["lead_hours"] = self.lead.total_seconds() / 3600
+        snapshot["running"] = self._worker is not None and self._worker.is_alive()
+        snapshot["disabled_reason"] = self._disabled_reason
+        return snapshot
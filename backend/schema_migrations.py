@@ -0,0 +1,311 @@
+# backend/schema_migrations.py
+"""
+Versioned schema migrations and a query-plan check for the hot paths.
+
+    python schema_migrations.py status    # list applied / pending migrations
+    python schema_migrations.py migrate   # apply pending migrations in order
+    python schema_migrations.py check     # EXPLAIN every *_QUERY; exit 1 on a full scan
+
+Each migration is (version, description, steps). A step is either a SQL
+string or a callable taking the connection, so it can inspect the live
+schema first (MySQL has no CREATE INDEX IF NOT EXISTS).
+"""
+import argparse
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+import booking_rollups
+import dentist_mcp_server
+import reminder_scheduler
+import waitlist
+from booking_rollups import ROLLUP_TABLE_DDL, rebuild_rollups
+from phone_numbers import normalize_phone
+
+
+def _has_index_on(cursor, table: str, columns) -> bool:
+    """True if some index on `table` already starts with exactly these columns."""
+    cursor.execute(
+        """
+        SELECT index_name AS index_name, column_name AS column_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+        """,
+        (table,),
+    )
+    indexes = {}
+    for row in cursor.fetchall():
+        indexes.setdefault(row['index_name'], []).append(row['column_name'].lower())
+    wanted = [c.lower() for c in columns]
+    return any(cols[:len(wanted)] == wanted for cols in indexes.values())
+
+
+def create_index(table: str, name: str, columns):
+    def step(conn):
+        cursor = conn.cursor(dictionary=True, buffered=True)
+        try:
+            if _has_index_on(cursor, table, columns):
+                print(f"   • {table}({', '.join(columns)}) already indexed, skipping {name}")
+                return
+            cursor.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+            print(f"   • created {name} on {table}({', '.join(columns)})")
+        finally:
+            cursor.close()
+    return step
+
+
+def drop_index(table: str, name: str):
+    def step(conn):
+        cursor = conn.cursor(buffered=True)
+        try:
+            cursor.execute(
+                """
+                SELECT 1 FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+                """,
+                (table, name),
+            )
+            if not cursor.fetchone():
+                print(f"   • {table}.{name} does not exist, skipping")
+                return
+            cursor.execute(f"DROP INDEX {name} ON {table}")
+            print(f"   • dropped {name} on {table}")
+        finally:
+            cursor.close()
+    return step
+
+
+def add_column(table: str, column: str, definition: str):
+    def step(conn):
+        cursor = conn.cursor(buffered=True)
+        try:
+            cursor.execute(
+                """
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+                """,
+                (table, column),
+            )
+            if cursor.fetchone():
+                print(f"   • {table}.{column} already exists, skipping")
+                return
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            print(f"   • added {table}.{column}")
+        finally:
+            cursor.close()
+    return step
+
+
+def _backfill_normalized_phones(conn):
+    """Fills patients.phone_normalized in Python so it matches normalize_phone exactly."""
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    try:
+        cursor.execute("SELECT patient_id, phone FROM patients WHERE phone_normalized IS NULL")
+        updates = [(normalize_phone(row['phone']), row['patient_id']) for row in cursor.fetchall()]
+        updates = [(phone, patient_id) for phone, patient_id in updates if phone]
+        if updates:
+            cursor.executemany("UPDATE patients SET phone_normalized = %s WHERE patient_id = %s", updates)
+        conn.commit()
+        print(f"   • normalized {len(updates)} patient phone numbers")
+    finally:
+        cursor.close()
+
+
+def _backfill_rollups(conn):
+    written = rebuild_rollups(conn)
+    print(f"   • backfilled {written} rollup rows")
+
+
+MIGRATIONS = [
+    (1, "Composite indexes for the appointments / patients hot paths", [
+        # Availability window, dashboard scans and today's bookings (superseded by migration 6)
+        create_index("appointments", "idx_appointments_date_status",
+                     ["appointment_date", "status", "dentist_id", "appointment_start_time"]),
+        # Upcoming / cancellable appointments for a patient
+        create_index("appointments", "idx_appointments_patient_status_date",
+                     ["patient_id", "status", "appointment_date"]),
+        # Last-visited dentist (ORDER BY appointment_date DESC LIMIT 1)
+        create_index("appointments", "idx_appointments_patient_date",
+                     ["patient_id", "appointment_date"]),
+        # Slot conflict check during booking
+        create_index("appointments", "idx_appointments_dentist_date_status",
+                     ["dentist_id", "appointment_date", "status"]),
+        create_index("patients", "idx_patients_phone", ["phone"]),
+        create_index("users", "idx_users_email", ["user_email"]),
+    ]),
+    (2, "Daily booking rollup table", [
+        ROLLUP_TABLE_DDL,
+        _backfill_rollups,
+    ]),
+    (3, "Canonical patient phone numbers", [
+        add_column("patients", "phone_normalized", "VARCHAR(20) NULL"),
+        _backfill_normalized_phones,
+        create_index("patients", "idx_patients_phone_normalized", ["phone_normalized"]),
+    ]),
+    (4, "Appointment reminder tracking", [
+        add_column("appointments", "reminder_sent_at", "DATETIME NULL"),
+        # Due-reminder scan: date range, Scheduled only, not yet reminded
+        create_index("appointments", "idx_appointments_date_status_reminder",
+                     ["appointment_date", "status", "reminder_sent_at"]),
+    ]),
+    (5, "Waitlist with a per-day (date, dentist) index", waitlist.WAITLIST_TABLES_DDL),
+    (6, "Covering index for the span-aware slot query", [
+        # BOOKED_SLOTS_QUERY also reads appointment_end_time; cover it so the window load stays index-only
+        create_index("appointments", "idx_appointments_date_status_span",
+                     ["appointment_date", "status", "dentist_id", "appointment_start_time", "appointment_end_time"]),
+        drop_index("appointments", "idx_appointments_date_status"),
+    ]),
+    (7, "Index for expiring lapsed waitlist entries", [
+        # add_entry's cleanup: Waiting entries whose latest_date has passed
+        create_index("waitlist_entries", "idx_waitlist_status_latest", ["status", "latest_date"]),
+    ]),
+]
+
+
+def _ensure_version_table(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def applied_versions(cursor) -> set:
+    _ensure_version_table(cursor)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row['version'] for row in cursor.fetchall()}
+
+
+def migrate(conn) -> int:
+    """Applies every pending migration in version order. Returns how many ran."""
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    try:
+        done = applied_versions(cursor)
+        ran = 0
+        for version, description, steps in MIGRATIONS:
+            if version in done:
+                continue
+            print(f"⏳ Applying migration {version}: {description}")
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description),
+            )
+            conn.commit()
+            ran += 1
+        return ran
+    finally:
+        cursor.close()
+
+
+# --- Query plan check ---
+# Tables small enough that a full scan is the right plan
+FULL_SCAN_ALLOWED = {"dentists"}
+
+def _sample_params():
+    """Representative parameters for every *_QUERY constant, keyed by name."""
+    today = date.today()
+    return {
+        "USER_BY_EMAIL_QUERY": ("admin@example.com",),
+        "PATIENT_OVERVIEW_QUERY": ("919876543210",),
+        "PATIENT_OVERVIEW_RAW_PHONE_QUERY": ("9876543210",),
+        "BOOKED_SLOTS_QUERY": (today, today + timedelta(days=14)),
+        "DENTIST_LIST_QUERY": (),
+        "LAST_VISIT_QUERY": (1,),
+        "SLOT_CONFLICT_QUERY": (1, today, "10:00:00", "00:30:00", "10:00:00"),
+        "PATIENT_CONTACT_QUERY": (1,),
+        "CANCELLABLE_APPOINTMENTS_QUERY": (1, today),
+        "DAILY_STATUS_COUNTS_QUERY": (today.replace(month=1, day=1),),
+        "TODAYS_BOOKINGS_QUERY": (),
+        "ROLLUP_COUNTS_QUERY": (today.replace(month=1, day=1),),
+        "WAITLIST_MATCH_QUERY": (today, 1, 20),
+        "SATISFIED_ENTRIES_QUERY": (1, today, today, 1),
+        "REMINDER_DUE_QUERY": (today, today + timedelta(days=1), datetime.now(),
+                               datetime.now() + timedelta(days=1), 200),
+    }
+
+
+def hot_queries():
+    """Yields (name, sql) for every *_QUERY constant in the data-layer modules."""
+    for module in (dentist_mcp_server, booking_rollups, reminder_scheduler, waitlist):
+        for name in sorted(vars(module)):
+            value = getattr(module, name)
+            if name.endswith("_QUERY") and isinstance(value, str):
+                yield name, value
+
+
+def check_query_plans(conn, min_rows: int = 1000) -> list:
+    """
+    EXPLAINs every hot query and returns a list of problems.
+    A plan row is a problem when it full-scans a table that is not in
+    FULL_SCAN_ALLOWED and either no index could be used or the optimiser
+    expects to read at least `min_rows` rows (tiny dev tables are often
+    scanned even when a good index exists).
+    """
+    params = _sample_params()
+    problems = []
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    try:
+        for name, sql in hot_queries():
+            if name not in params:
+                problems.append(f"{name}: no sample parameters registered in schema_migrations._sample_params")
+                continue
+            # EXPLAIN does not take locking clauses
+            statement = re.sub(r"\s+FOR\s+UPDATE\b.*$", "", sql.strip().rstrip(";"), flags=re.IGNORECASE | re.DOTALL)
+            cursor.execute("EXPLAIN " + statement, params[name])
+            for row in cursor.fetchall():
+                table = row.get('table')
+                scan = f"type={row.get('type')} key={row.get('key')} rows={row.get('rows')}"
+                print(f"   {name:<32} {str(table):<28} {scan}")
+                if row.get('type') != "ALL" or table in FULL_SCAN_ALLOWED:
+                    continue
+                if not row.get('possible_keys') or (row.get('rows') or 0) >= min_rows:
+                    problems.append(f"{name}: full table scan on {table} ({scan})")
+    finally:
+        cursor.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema migrations and query plan checks.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("status", help="Show applied and pending migrations")
+    subcommands.add_parser("migrate", help="Apply pending migrations")
+    check = subcommands.add_parser("check", help="EXPLAIN every hot query and fail on full scans")
+    check.add_argument("--min-rows", type=int, default=1000,
+                       help="Ignore full scans estimated below this many rows when an index exists")
+    args = parser.parse_args()
+
+    with dentist_mcp_server.db_pool.connection() as conn:
+        if args.command == "status":
+            cursor = conn.cursor(dictionary=True, buffered=True)
+            try:
+                done = applied_versions(cursor)
+            finally:
+                cursor.close()
+            for version, description, _ in MIGRATIONS:
+                print(f"{'✅' if version in done else '⏳'} {version}: {description}")
+        elif args.command == "migrate":
+            ran = migrate(conn)
+            print(f"✅ Applied {ran} migration(s)." if ran else "✅ Schema is up to date.")
+        else:
+            problems = check_query_plans(conn, min_rows=args.min_rows)
+            if problems:
+                print("\n❌ Query plan check failed:")
+                for problem in problems:
+                    print(f"  - {problem}")
+                sys.exit(1)
+            print("\n✅ No hot query does a full table scan.")
+
+
+if __name__ == "__main__":
+    main()
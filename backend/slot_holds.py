@@ -0,0 +1,103 @@
+# backend/slot_holds.py
+import heapq
+import threading
+import time
+
+
+class SlotHolds:
+    """
+    Short-lived, in-process leases on slots that were just offered to a caller.
+    Holds live in {(day, dentist_id): {minute: (expires_at, holder, length)}}; a min-heap
+    of expiry times lets each call sweep out only the holds that have lapsed.
+    """
+
+    def __init__(self, ttl: float = 120.0):
+        self.ttl = ttl
+        self._holds = {}
+        self._expiry_heap = []
+        self._lock = threading.Lock()
+        self._stats = {"placed": 0, "converted": 0, "expired": 0, "conflicts": 0}
+
+    def _sweep(self, now: float):
+        # Heap entries can be outdated (hold renewed or released); only drop live matches
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, day, dentist_id, minute = heapq.heappop(self._expiry_heap)
+            slots = self._holds.get((day, dentist_id))
+            if not slots or minute not in slots or slots[minute][0] != expires_at:
+                continue
+            del slots[minute]
+            self._stats["expired"] += 1
+            if not slots:
+                del self._holds[(day, dentist_id)]
+
+    def hold(self, day, dentist_id: int, minute: int, holder=None, length: int = 1, ttl: float = None) -> bool:
+        """
+        Places or renews a hold on `length` minutes starting at `minute`,
+        for `ttl` seconds (the default lease when None).
+        Returns False if someone else holds a slot starting at the same minute.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            slots = self._holds.setdefault((day, dentist_id), {})
+            current = slots.get(minute)
+            if current and current[1] is not None and current[1] != holder:
+                self._stats["conflicts"] += 1
+                return False
+            expires_at = now + (self.ttl if ttl is None else ttl)
+            slots[minute] = (expires_at, holder, length)
+            heapq.heappush(self._expiry_heap, (expires_at, day, dentist_id, minute))
+            self._stats["placed"] += 1
+            return True
+
+    def holder_of(self, day, dentist_id: int, minute: int):
+        """Returns (True, holder) if the slot is held, else (False, None)."""
+        with self._lock:
+            self._sweep(time.monotonic())
+            current = self._holds.get((day, dentist_id), {}).get(minute)
+        return (True, current[1]) if current else (False, None)
+
+    def held_spans(self, day, dentist_id: int, exclude_holder=None):
+        """
+        (start, end, holder) for every hold on (day, dentist), ignoring holds
+        that belong to `exclude_holder`.
+        """
+        with self._lock:
+            self._sweep(time.monotonic())
+            slots = self._holds.get((day, dentist_id))
+            if not slots:
+                return []
+            return [
+                (m, m + length, holder) for m, (_, holder, length) in slots.items()
+                if exclude_holder is None or holder != exclude_holder
+            ]
+
+    def release(self, day, dentist_id: int, minute: int, converted: bool = False):
+        with self._lock:
+            slots = self._holds.get((day, dentist_id))
+            if slots and slots.pop(minute, None) is not None:
+                if converted:
+                    self._stats["converted"] += 1
+                if not slots:
+                    del self._holds[(day, dentist_id)]
+
+    def release_holder(self, holder) -> int:
+        """Drops every hold `holder` has, e.g. the other slots offered to a caller who just booked."""
+        released = 0
+        with self._lock:
+            for key in list(self._holds):
+                slots = self._holds[key]
+                for minute in [m for m, (_, h, _) in slots.items() if h == holder]:
+                    del slots[minute]
+                    released += 1
+                if not slots:
+                    del self._holds[key]
+        return released
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._sweep(time.monotonic())
+            snapshot = dict(self._stats)
+            snapshot["active"] = sum(len(slots) for slots in self._holds.values())
+            snapshot["ttl_seconds"] = self.ttl
+        return snapshot
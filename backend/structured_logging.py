@@ -0,0 +1,123 @@
+# backend/structured_logging.py
+"""
+Compact JSON-line logging for the bridge, the MCP tools and their background workers.
+
+Calls to a logger only build a LogRecord and put it on a queue; a
+QueueListener thread does the JSON encoding and the stderr write, so request
+threads and the event loop never block on I/O. Lines never go to stdout: the
+MCP server speaks JSON-RPC over stdio there. Every line carries the id of
+the request that produced it (bound by the bridge middleware) and any
+`extra` fields, e.g. tool, status and duration_ms.
+
+    LOG_LEVEL        minimum level (default INFO)
+    LOG_SAMPLE_RATE  fraction of requests whose DEBUG/INFO lines are kept (default 1.0);
+                     warnings and errors are always written
+    LOG_FORMAT       json (default) or text
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+ROOT_LOGGER = "dentist"
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+_sampled_var = contextvars.ContextVar("log_sampled", default=True)
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+_configure_lock = threading.Lock()
+_sample_rate = 1.0
+
+
+class JsonLineFormatter(logging.Formatter):
+    """One compact JSON object per record: ts, level, logger, msg, request_id, then the extra fields."""
+
+    def format(self, record) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"), ensure_ascii=False)
+
+
+class _ContextFilter(logging.Filter):
+    """Runs on the calling thread: drops unsampled DEBUG/INFO records and stamps the request id."""
+
+    def filter(self, record) -> bool:
+        if record.levelno < logging.WARNING and not _sampled_var.get():
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Only resolve what can't wait; JSON encoding happens on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: str = None, sample_rate: float = None, log_format: str = None):
+    """Installs the queue handler on the "dentist" logger tree. Safe to call more than once."""
+    global _listener, _sample_rate
+    with _configure_lock:
+        if _listener is not None:
+            return
+        level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        _sample_rate = float(os.getenv("LOG_SAMPLE_RATE", "1.0") if sample_rate is None else sample_rate)
+        log_format = (log_format or os.getenv("LOG_FORMAT", "json")).lower()
+
+        output = logging.StreamHandler(sys.stderr)
+        if log_format == "text":
+            output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+        else:
+            output.setFormatter(JsonLineFormatter())
+        log_queue = queue.SimpleQueue()
+        handler = _DeferredQueueHandler(log_queue)
+        handler.addFilter(_ContextFilter())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level)
+        root.handlers = [handler]
+        root.propagate = False
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)  # flushes whatever is still queued
+
+
+def get_logger(name: str) -> logging.Logger:
+    """A logger under the "dentist" tree, e.g. get_logger("bridge") -> "dentist.bridge"."""
+    configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def bind_request(request_id: str):
+    """Binds a request id (and this request's sampling decision) to the current context."""
+    sampled = _sample_rate >= 1.0 or random.random() < _sample_rate
+    return request_id_var.set(request_id), _sampled_var.set(sampled)
+
+
+def unbind_request(tokens):
+    request_token, sampled_token = tokens
+    request_id_var.reset(request_token)
+    _sampled_var.reset(sampled_token)
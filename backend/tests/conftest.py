@@ -0,0 +1,19 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+# The backend modules import each other as top-level modules (python dentist_mcp_server.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClock:
+    """Stands in for time.monotonic so expiry can be tested without sleeping."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
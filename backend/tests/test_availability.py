@@ -0,0 +1,92 @@
+# backend/tests/test_availability.py
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from availability import (
+    AvailabilityWindow, SlotGrid, build_booked_masks, format_minutes, parse_preference, preference_penalty, to_minutes,
+)
+from clinic_calendar import ClinicCalendar
+
+MONDAY = date(2026, 11, 2)
+
+
+def test_to_minutes_accepts_every_time_shape():
+    assert to_minutes("09:30") == 570
+    assert to_minutes("09:30:00") == 570
+    assert to_minutes(time(9, 30)) == 570
+    assert to_minutes(timedelta(hours=9, minutes=30)) == 570
+    assert to_minutes(570) == 570
+    assert format_minutes(570) == "09:30:00"
+
+
+@pytest.mark.parametrize("preference, expected", [
+    (None, None),
+    ("  ", None),
+    ("Morning", (0, 720)),
+    ("15:00", 900),
+    ("9:30:00", 570),
+])
+def test_parse_preference(preference, expected):
+    assert parse_preference(preference) == expected
+
+
+@pytest.mark.parametrize("preference", ["anytime", "evening-ish", "15", "24:00", "15:99"])
+def test_parse_preference_rejects_free_text(preference):
+    with pytest.raises(ValueError, match="morning, afternoon, evening"):
+        parse_preference(preference)
+
+
+def test_preference_penalty():
+    assert preference_penalty(None)(600) == 0
+    afternoon = preference_penalty("afternoon")
+    assert (afternoon(600), afternoon(800)) == (1, 0)
+    assert preference_penalty("15:00")(14 * 60) == 60
+
+
+def test_span_mask_covers_every_overlapped_slot():
+    grid = SlotGrid(["10:00", "10:30", "11:00", "11:30"], slot_minutes=30)
+    assert grid.span_mask(600, 630) == 0b0001
+    assert grid.span_mask(615, 675) == 0b0111  # 10:15-11:15 touches three slots
+    assert grid.span_mask(720, 780) == 0
+
+
+def test_build_booked_masks_uses_end_time():
+    grid = SlotGrid(["10:00", "10:30", "11:00"], slot_minutes=30)
+    rows = [{"appointment_date": MONDAY, "dentist_id": 1,
+             "appointment_start_time": timedelta(hours=10), "appointment_end_time": timedelta(hours=11)}]
+    assert build_booked_masks(grid, rows) == {(MONDAY, 1): 0b011}
+
+
+def _window(booked=None, duration=None):
+    return AvailabilityWindow(ClinicCalendar(), MONDAY, MONDAY + timedelta(days=6), booked, duration)
+
+
+def test_earliest_skips_booked_slots_and_breaks_ties_by_dentist_order():
+    calendar = ClinicCalendar()
+    first = calendar.grid.bit("10:00")
+    window = _window({(MONDAY, 1): first})
+    assert window.earliest([1, 2]) == (MONDAY, "10:00:00", 2)
+    assert window.earliest([1]) == (MONDAY, "10:30:00", 1)
+
+
+def test_long_appointments_need_consecutive_free_slots():
+    calendar = ClinicCalendar({"appointment_types": {"filling": 60}})
+    booked = {(MONDAY, 1): calendar.grid.bit("10:30")}
+    window = AvailabilityWindow(calendar, MONDAY, MONDAY, booked, duration=60)
+    assert not window.is_free(MONDAY, 1, "10:00")  # would run into the 10:30 booking
+    assert not window.is_free(MONDAY, 1, "12:30")  # would run into the lunch break
+    assert window.is_free(MONDAY, 1, "11:00")
+
+
+def test_free_mask_drops_past_slots_today():
+    window = _window()
+    now = datetime.combine(MONDAY, time(14, 10))
+    assert window.earliest([1], now) == (MONDAY, "14:30:00", 1)
+
+
+def test_ranked_orders_by_preferred_dentist_then_preference():
+    window = _window()
+    ranked = window.ranked([1, 2], 3, preferred_id=2, preference="afternoon")
+    # Afternoon starts at 12:00, so the last morning session slots come first
+    assert ranked == [(MONDAY, "12:00:00", 2), (MONDAY, "12:30:00", 2), (MONDAY, "14:00:00", 2)]
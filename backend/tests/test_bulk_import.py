@@ -0,0 +1,129 @@
+# backend/tests/test_bulk_import.py
+import io
+from datetime import date
+
+import pytest
+from mysql.connector import errors
+
+import bulk_import
+from bulk_import import import_appointments, import_patients, read_records
+
+BAD_DENTIST = 99
+
+
+class FakeCursor:
+    """Answers the importers' lookups and records inserts; dentist 99 fails its foreign key."""
+
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+
+    def execute(self, statement, params=()):
+        if statement.startswith("SELECT phone_normalized, MIN(patient_id)"):
+            self.result = [(phone, self.db.patients[phone]) for phone in params if phone in self.db.patients]
+        elif statement.startswith("SELECT phone_normalized"):
+            self.result = [(phone,) for phone in params if phone in self.db.patients]
+        elif statement.startswith("SELECT"):
+            self.result = []
+        elif statement.startswith("INSERT INTO appointments"):
+            if params[0] == BAD_DENTIST:
+                raise errors.IntegrityError(msg="Cannot add or update a child row", errno=1452)
+            self.db.pending.append(params)
+        elif statement.startswith("INSERT INTO patients"):
+            self.db.pending.append(params)
+
+    def executemany(self, statement, rows):
+        for row in rows:
+            self.execute(statement, row)
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, patients=None):
+        self.patients = dict(patients or {})
+        self.pending = []
+        self.committed = []
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+@pytest.fixture(autouse=True)
+def no_rollups(monkeypatch):
+    monkeypatch.setattr(bulk_import, "rebuild_rollups", lambda conn, since=None: 0)
+
+
+def _ndjson(*lines):
+    return read_records(io.StringIO("\n".join(lines) + "\n"), "ndjson")
+
+
+def test_patients_are_validated_and_deduplicated():
+    conn = FakeConnection(patients={"919876543210": 1})
+    records = read_records(io.StringIO(
+        "full_name,date_of_birth,phone\n"
+        "Asha,1990-01-31,98765 43210\n"
+        "Ravi,1985-13-01,9876543211\n"
+        "Meena,1979-05-05,\n"
+        "Kiran,1992-02-02,+91 98765 43212\n"
+        "Kiran Again,1992-02-02,098765 43212\n"
+    ))
+    summary = import_patients(conn, records)
+    assert (summary["inserted"], summary["duplicates"], summary["failed"]) == (1, 2, 2)
+    assert [e["row"] for e in summary["errors"]] == [2, 3]
+    assert conn.committed[0][3] == "919876543212"
+
+
+def test_unreadable_ndjson_lines_are_row_errors():
+    conn = FakeConnection(patients={"919876543210": 1})
+    summary = import_appointments(conn, _ndjson(
+        '{"phone": "9876543210", "dentist_id": 1, "appointment_date": "2026-01-05", "appointment_start_time": "10:00"}',
+        '{not json',
+        '[1, 2]',
+        '{"phone": "9876543210", "dentist_id": 1, "appointment_date": "2026-01-05", '
+        '"appointment_start_time": "11:00", "duration_minutes": [30]}',
+    ))
+    assert summary["inserted"] == 1
+    assert [e["row"] for e in summary["errors"]] == [2, 3, 4]
+    assert summary["errors"][0]["error"].startswith("invalid JSON")
+    assert summary["errors"][1]["error"] == "expected an object, got list"
+
+
+def test_a_rejected_row_does_not_lose_its_neighbours():
+    conn = FakeConnection(patients={"919876543210": 1})
+    summary = import_appointments(conn, _ndjson(*(
+        f'{{"phone": "9876543210", "dentist_id": {dentist_id}, "appointment_date": "2026-01-05", '
+        f'"appointment_start_time": "{start}"}}'
+        for dentist_id, start in ((1, "10:00"), (BAD_DENTIST, "10:30"), (2, "11:00"))
+    )))
+    assert summary["inserted"] == 2
+    assert [e["row"] for e in summary["errors"]] == [2]
+    assert "child row" in summary["errors"][0]["error"]
+    assert [row[0] for row in conn.committed] == [1, 2]
+    assert conn.committed[0][2] == date(2026, 1, 5)
+
+
+def test_appointment_rows_are_validated():
+    conn = FakeConnection(patients={"919876543210": 1})
+    summary = import_appointments(conn, _ndjson(
+        '{"phone": "9876543210", "dentist_id": 1, "appointment_date": "2026-01-05", '
+        '"appointment_start_time": "10:00", "appointment_end_time": "09:30"}',
+        '{"phone": "9876543210", "dentist_id": 1, "appointment_date": "2026-01-05", '
+        '"appointment_start_time": "10:00", "status": "postponed"}',
+        '{"phone": "9999999999", "dentist_id": 1, "appointment_date": "2026-01-05", "appointment_start_time": "10:00"}',
+    ))
+    assert summary["inserted"] == 0
+    assert [e["error"] for e in summary["errors"]] == [
+        "appointment ends before it starts", "unknown status 'Postponed'", "no patient with phone 919999999999",
+    ]
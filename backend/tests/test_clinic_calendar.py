@@ -0,0 +1,68 @@
+# backend/tests/test_clinic_calendar.py
+import json
+from datetime import date
+
+import pytest
+
+from clinic_calendar import ClinicCalendar, load_calendar
+
+MONDAY = date(2026, 11, 2)
+SATURDAY = date(2026, 11, 7)
+SUNDAY = date(2026, 11, 8)
+
+
+def _starts(calendar, day, dentist_id=1, cells=1):
+    mask = calendar.start_mask(day, dentist_id, cells)
+    return [m for i, m in enumerate(calendar.grid.minutes) if mask >> i & 1]
+
+
+def test_default_calendar_is_the_original_schedule():
+    calendar = ClinicCalendar()
+    assert _starts(calendar, MONDAY)[:2] == [600, 630]
+    assert 780 not in _starts(calendar, MONDAY)  # 13:00-14:00 lunch
+    assert _starts(calendar, SUNDAY) == []
+    assert list(calendar.open_days(MONDAY, SUNDAY))[-1] == SATURDAY
+
+
+def test_breaks_holidays_and_dentist_overrides():
+    calendar = ClinicCalendar({
+        "slot_minutes": 15,
+        "breaks": [["11:30", "11:45"]],
+        "holidays": ["2026-11-03"],
+        "dentists": {"2": {"working_hours": {"sat": []}, "holidays": ["2026-11-04"]}},
+    })
+    assert 690 not in _starts(calendar, MONDAY)
+    assert _starts(calendar, date(2026, 11, 3)) == []
+    assert _starts(calendar, date(2026, 11, 4), dentist_id=2) == []
+    assert _starts(calendar, date(2026, 11, 4), dentist_id=1)
+    assert _starts(calendar, SATURDAY, dentist_id=2) == []
+
+
+def test_durations_and_bookability():
+    calendar = ClinicCalendar({"appointment_types": {"Root Canal": 90}})
+    assert calendar.duration_for(None) == 30
+    assert calendar.duration_for(" root canal ") == 90
+    with pytest.raises(ValueError, match="known: root canal"):
+        calendar.duration_for("xray")
+    assert calendar.is_bookable(MONDAY, 1, 600, 90)
+    assert calendar.is_bookable(MONDAY, 1, 690, 90)  # ends exactly at 13:00
+    assert not calendar.is_bookable(MONDAY, 1, 720, 90)  # runs into lunch
+    assert not calendar.is_bookable(MONDAY, 1, 605)  # off the grid
+
+
+@pytest.mark.parametrize("config, where", [
+    ({"working_hours": {"tues": []}}, "in working_hours"),
+    ({"dentists": {"2": {"working_hours": {"Sat": []}}}}, "in dentists.2.working_hours"),
+])
+def test_unknown_weekday_keys_are_rejected(config, where):
+    with pytest.raises(ValueError, match=where):
+        ClinicCalendar(config)
+
+
+def test_load_calendar(tmp_path):
+    path = tmp_path / "clinic_calendar.json"
+    path.write_text(json.dumps({"slot_minutes": 15}), encoding="utf-8")
+    assert load_calendar(str(path), required=True).slot_minutes == 15
+    assert load_calendar(str(tmp_path / "missing.json")).slot_minutes == 30
+    with pytest.raises(FileNotFoundError, match="CLINIC_CALENDAR_PATH"):
+        load_calendar(str(tmp_path / "missing.json"), required=True)
@@ -0,0 +1,57 @@
+# backend/tests/test_idempotency_store.py
+import threading
+
+import pytest
+
+from idempotency_store import IN_PROGRESS, MISMATCH, NEW, REPLAY, IdempotencyStore, fingerprint
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IdempotencyStore(str(tmp_path / "keys.db"), ttl=60, wait_timeout=0.2)
+
+
+def test_fingerprint_ignores_key_order():
+    assert fingerprint({"a": 1, "b": 2}) == fingerprint({"b": 2, "a": 1})
+    assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+
+
+def test_finished_result_is_replayed_and_survives_a_restart(store, tmp_path):
+    request = fingerprint({"patient_id": 1})
+    assert store.begin("key-1", request) == (NEW, None)
+    store.finish("key-1", request, {"status": "Success", "appointment_id": 42})
+    assert store.begin("key-1", request) == (REPLAY, {"status": "Success", "appointment_id": 42})
+
+    restarted = IdempotencyStore(str(tmp_path / "keys.db"), ttl=60)
+    assert restarted.begin("key-1", request) == (REPLAY, {"status": "Success", "appointment_id": 42})
+
+
+def test_reusing_a_key_for_other_arguments_is_a_mismatch(store):
+    store.begin("key-1", fingerprint({"patient_id": 1}))
+    store.finish("key-1", fingerprint({"patient_id": 1}), {"status": "Success"})
+    assert store.begin("key-1", fingerprint({"patient_id": 2})) == (MISMATCH, None)
+
+
+def test_abandoned_claim_lets_the_retry_run(store):
+    request = fingerprint({})
+    store.begin("key-1", request)
+    store.abandon("key-1")
+    assert store.begin("key-1", request) == (NEW, None)
+
+
+def test_concurrent_retry_waits_for_the_original(store):
+    request = fingerprint({})
+    store.wait_timeout = 5
+    assert store.begin("key-1", request) == (NEW, None)
+    seen = []
+    retry = threading.Thread(target=lambda: seen.append(store.begin("key-1", request)))
+    retry.start()
+    store.finish("key-1", request, {"status": "Success"})
+    retry.join(5)
+    assert seen == [(REPLAY, {"status": "Success"})]
+
+
+def test_retry_times_out_while_the_original_is_still_running(store):
+    request = fingerprint({})
+    store.begin("key-1", request)
+    assert store.begin("key-1", request) == (IN_PROGRESS, None)
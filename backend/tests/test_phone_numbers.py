@@ -0,0 +1,19 @@
+# backend/tests/test_phone_numbers.py
+import pytest
+
+from phone_numbers import normalize_phone
+
+
+@pytest.mark.parametrize("raw", ["+91 98765-43210", "098765 43210", "9876543210", "0091 9876543210", 9876543210])
+def test_formats_of_one_number_normalize_alike(raw):
+    assert normalize_phone(raw) == "919876543210"
+
+
+def test_other_country_codes_are_kept():
+    assert normalize_phone("+1 (415) 555-0100") == "14155550100"
+    assert normalize_phone("5550100", country_code="1") == "5550100"
+
+
+@pytest.mark.parametrize("raw", [None, "", "n/a", "---"])
+def test_nothing_usable_gives_none(raw):
+    assert normalize_phone(raw) is None
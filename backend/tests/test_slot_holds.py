@@ -0,0 +1,54 @@
+# backend/tests/test_slot_holds.py
+from datetime import date
+
+import pytest
+
+import slot_holds
+from conftest import FakeClock
+from slot_holds import SlotHolds
+
+DAY = date(2026, 11, 2)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(slot_holds.time, "monotonic", fake)
+    return fake
+
+
+def test_a_hold_blocks_other_holders_until_it_expires(clock):
+    holds = SlotHolds(ttl=120)
+    assert holds.hold(DAY, 1, 600, holder=7, length=30)
+    assert not holds.hold(DAY, 1, 600, holder=8)
+    assert holds.hold(DAY, 1, 600, holder=7)  # renewing your own hold is fine
+    clock.advance(121)
+    assert holds.hold(DAY, 1, 600, holder=8)
+    assert holds.stats()["conflicts"] == 1
+
+
+def test_held_spans_leave_out_the_callers_own_holds(clock):
+    holds = SlotHolds()
+    holds.hold(DAY, 1, 600, holder=7, length=60)
+    holds.hold(DAY, 1, 720, holder=8, length=30)
+    assert holds.held_spans(DAY, 1, exclude_holder=7) == [(720, 750, 8)]
+    assert sorted(holds.held_spans(DAY, 1)) == [(600, 660, 7), (720, 750, 8)]
+
+
+def test_release_holder_drops_every_offer_to_that_patient(clock):
+    holds = SlotHolds()
+    holds.hold(DAY, 1, 600, holder=7)
+    holds.hold(DAY, 2, 630, holder=7)
+    holds.hold(DAY, 1, 660, holder=8)
+    assert holds.release_holder(7) == 2
+    assert holds.holder_of(DAY, 2, 630) == (False, None)
+    assert holds.holder_of(DAY, 1, 660) == (True, 8)
+    assert holds.stats()["active"] == 1
+
+
+def test_release_counts_conversions(clock):
+    holds = SlotHolds()
+    holds.hold(DAY, 1, 600, holder=7)
+    holds.release(DAY, 1, 600, converted=True)
+    assert holds.stats()["converted"] == 1
+    assert holds.held_spans(DAY, 1) == []
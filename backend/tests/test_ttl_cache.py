@@ -0,0 +1,46 @@
+# backend/tests/test_ttl_cache.py
+import pytest
+
+import ttl_cache
+from conftest import FakeClock
+from ttl_cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", fake)
+    return fake
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    clock.advance(9)
+    assert cache.get("a") == 1
+    clock.advance(1)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_if_and_hit_ratio(clock):
+    cache = TTLCache(maxsize=8, ttl=10)
+    for day in ("2026-11-02", "2026-11-03"):
+        for dentist_id in (1, 2):
+            cache.set((day, dentist_id), 0)
+    cache.invalidate_if(lambda key: key[1] == 1)
+    assert cache.get(("2026-11-02", 1), "gone") == "gone"
+    assert cache.get(("2026-11-02", 2)) == 0
+    stats = cache.stats()
+    assert (stats["invalidations"], stats["size"], stats["hit_ratio"]) == (2, 2, 0.5)
@@ -0,0 +1,16 @@
+# backend/tests/test_waitlist.py
+import pytest
+
+from waitlist import matches_preference
+
+
+@pytest.mark.parametrize("preference, minute, expected", [
+    (None, 600, True),
+    ("morning", 600, True),
+    ("morning", 840, False),
+    ("15:00", 14 * 60, True),
+    ("15:00", 13 * 60, False),
+    ("anytime", 600, False),
+])
+def test_matches_preference(preference, minute, expected):
+    assert matches_preference(preference, minute) is expected
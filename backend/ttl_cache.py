@@ -0,0 +1,69 @@
+# backend/ttl_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    A thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    Keeps hit/miss/eviction counters for the admin stats endpoint.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self._stats["misses"] += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self._stats["invalidations"] += 1
+
+    def invalidate_if(self, predicate):
+        """Drops every entry whose key matches `predicate`."""
+        with self._lock:
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                del self._data[key]
+            self._stats["invalidations"] += len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({"size": len(self._data), "maxsize": self.maxsize, "ttl_seconds": self.ttl})
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_ratio"] = round(snapshot["hits"] / lookups, 3) if lookups else None
+        return snapshot
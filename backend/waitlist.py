@@ -0,0 +1,161 @@
+# backend/waitlist.py
+"""
+Patients waiting for an earlier slot.
+
+An entry covers a date range and either one dentist or any dentist. It is
+expanded into one waitlist_days row per day, keyed by
+(wait_date, dentist_id, waitlist_id) with dentist_id 0 meaning "any".
+When a slot frees up, the candidates for that (date, dentist) are one
+primary-key range read, however long the waitlist is.
+"""
+from datetime import timedelta
+
+from mysql.connector import errors
+
+import metrics
+from availability import parse_preference
+from db_pool import MISSING_TABLE_ERRNO
+
+ANY_DENTIST = 0
+# A clock-time preference ("15:00") accepts slots this close to it
+PREFERENCE_TOLERANCE_MINUTES = 60
+
+WAITLIST_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS waitlist_entries (
+        waitlist_id INT AUTO_INCREMENT PRIMARY KEY,
+        patient_id INT NOT NULL,
+        dentist_id INT NULL,
+        earliest_date DATE NOT NULL,
+        latest_date DATE NOT NULL,
+        time_preference VARCHAR(20) NULL,
+        appointment_type VARCHAR(50) NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'Waiting',
+        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        last_offered_at DATETIME NULL,
+        KEY idx_waitlist_patient_status (patient_id, status)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS waitlist_days (
+        wait_date DATE NOT NULL,
+        dentist_id INT NOT NULL,
+        waitlist_id INT NOT NULL,
+        PRIMARY KEY (wait_date, dentist_id, waitlist_id),
+        KEY idx_waitlist_days_entry (waitlist_id)
+    )
+    """,
+]
+
+WAITLIST_MATCH_QUERY = """
+    SELECT e.waitlist_id, e.patient_id, e.time_preference, e.appointment_type,
+           p.full_name, p.phone
+    FROM waitlist_days w
+    JOIN waitlist_entries e ON e.waitlist_id = w.waitlist_id
+    JOIN patients p ON p.patient_id = e.patient_id
+    WHERE w.wait_date = %s AND w.dentist_id IN (%s, 0) AND e.status = 'Waiting'
+    ORDER BY w.waitlist_id
+    LIMIT %s
+"""
+
+SATISFIED_ENTRIES_QUERY = """
+    SELECT waitlist_id, time_preference
+    FROM waitlist_entries
+    WHERE patient_id = %s AND status = 'Waiting'
+      AND earliest_date <= %s AND latest_date >= %s
+      AND (dentist_id IS NULL OR dentist_id = %s)
+"""
+
+metrics.name_queries(globals())
+
+
+def matches_preference(preference: str, minute: int) -> bool:
+    """
+    True if a slot starting at `minute` suits a waitlist entry's time preference.
+    An unreadable preference (stored before join_waitlist validated it) matches nothing.
+    """
+    try:
+        parsed = parse_preference(preference)
+    except ValueError:
+        return False
+    if parsed is None:
+        return True
+    if isinstance(parsed, tuple):
+        lo, hi = parsed
+        return lo <= minute < hi
+    return abs(minute - parsed) <= PREFERENCE_TOLERANCE_MINUTES
+
+
+def add_entry(conn, patient_id: int, earliest_date, latest_date, dentist_id: int = None,
+              time_preference: str = None, appointment_type: str = None) -> int:
+    """Stores an entry and its per-day index rows in one transaction. Returns the waitlist_id."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO waitlist_entries (patient_id, dentist_id, earliest_date, latest_date, time_preference, appointment_type) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (patient_id, dentist_id, earliest_date, latest_date, time_preference, appointment_type),
+        )
+        waitlist_id = cursor.lastrowid
+        days = (latest_date - earliest_date).days + 1
+        cursor.executemany(
+            "INSERT INTO waitlist_days (wait_date, dentist_id, waitlist_id) VALUES (%s, %s, %s)",
+            [(earliest_date + timedelta(days=n), dentist_id or ANY_DENTIST, waitlist_id) for n in range(days)],
+        )
+        # Index rows for days that have passed are never matched again, and
+        # entries whose whole range has passed can no longer be offered anything
+        # (a range read on idx_waitlist_status_latest, not a table scan)
+        cursor.execute("DELETE FROM waitlist_days WHERE wait_date < CURDATE()")
+        cursor.execute(
+            "UPDATE waitlist_entries SET status = 'Expired' WHERE status = 'Waiting' AND latest_date < CURDATE()"
+        )
+        conn.commit()
+        return waitlist_id
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _close(cursor, where: str, params, status: str) -> int:
+    try:
+        cursor.execute(
+            f"DELETE w FROM waitlist_days w JOIN waitlist_entries e ON e.waitlist_id = w.waitlist_id WHERE {where}",
+            params,
+        )
+        cursor.execute(f"UPDATE waitlist_entries e SET e.status = %s WHERE {where}", (status, *params))
+    except errors.ProgrammingError as err:
+        # Without the waitlist tables there is nothing to close
+        if err.errno != MISSING_TABLE_ERRNO:
+            raise
+        return 0
+    return cursor.rowcount
+
+
+def close_entries(cursor, patient_id: int, status: str) -> int:
+    """
+    Takes all of a patient's Waiting entries off the waitlist (e.g. status "Left").
+    Runs on the caller's cursor, inside its transaction. Returns how many were closed.
+    """
+    return _close(cursor, "e.patient_id = %s AND e.status = 'Waiting'", (patient_id,), status)
+
+
+def close_satisfied_entries(cursor, patient_id: int, day, dentist_id: int, minute: int) -> int:
+    """
+    Marks "Booked" the patient's Waiting entries that a booking on `day` with
+    `dentist_id` at `minute` satisfies. Entries for other dates, another
+    dentist or another time of day stay on the waitlist. Runs on the caller's
+    cursor, inside its transaction. Returns how many were closed.
+    """
+    try:
+        cursor.execute(SATISFIED_ENTRIES_QUERY, (patient_id, day, day, dentist_id))
+        rows = cursor.fetchall()
+    except errors.ProgrammingError as err:
+        if err.errno != MISSING_TABLE_ERRNO:
+            raise
+        return 0
+    ids = [row['waitlist_id'] for row in rows if matches_preference(row['time_preference'], minute)]
+    if not ids:
+        return 0
+    return _close(cursor, f"e.waitlist_id IN ({', '.join(['%s'] * len(ids))})", ids, "Booked")
@@ -41,6 +41,13 @@ interface MonthlyBreakdownData {
   cancellations: number;
 }
 
+interface DashboardOverview {
+  stats: Stats;
+  chart_data: ChartData[];
+  todays_bookings: TodaysBooking[];
+  monthly_breakdown: MonthlyBreakdownData[];
+}
+
 export default function AdminDashboard() {
   const [stats, setStats] = useState<Stats | null>(null);
   const [chartData, setChartData] = useState<ChartData[]>([]);
@@ -68,17 +75,13 @@ export default function AdminDashboard() {
     const fetchData = async () => {
       setLoading(true);
       try {
-        const [statsRes, chartRes, todaysBookingsRes, monthlyRes] = await Promise.all([
-          apiClient.get(`/admin/stats`),
-          apiClient.get(`/admin/chart-data`),
-          apiClient.get(`/admin/todays-bookings`),
-          apiClient.get(`/admin/monthly-breakdown`),
-        ]);
-
-        setStats(statsRes.data);
-        setChartData(chartRes.data.data);
-        setTodaysBookings(todaysBookingsRes.data.data);
-        setMonthlyData(monthlyRes.data.data);
+        // One request for every dashboard panel (one auth check, one DB scan)
+        const { data } = await apiClient.get<DashboardOverview>(`/admin/dashboard`);
+
+        setStats(data.stats);
+        setChartData(data.chart_data);
+        setTodaysBookings(data.todays_bookings);
+        setMonthlyData(data.monthly_breakdown);
 
       } catch (err) {
         if (axios.isAxiosError(err)) {